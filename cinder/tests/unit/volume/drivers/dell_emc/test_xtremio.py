@@ -16,6 +16,8 @@
 import copy
 import time
 
+import eventlet
+import fixtures
 import mock
 import six
 
@@ -158,13 +160,14 @@ def xms_request(object_type='volumes', method='GET', data=None,
             return get_obj(object_type, name, idx)
         else:
             if data and data.get('full') == 1:
-                filter_term = data.get('filter')
-                if not filter_term:
-                    entities = list(res.values())
-                else:
+                filter_terms = data.get('filter') or []
+                if isinstance(filter_terms, six.string_types):
+                    filter_terms = [filter_terms]
+                entities = list(res.values())
+                for filter_term in filter_terms:
                     field, oper, value = filter_term.split(':', 2)
                     comp = xms_filters[oper]
-                    entities = [o for o in res.values()
+                    entities = [o for o in entities
                                 if comp(o.get(field), value)]
                 return {object_type: entities}
             else:
@@ -333,7 +336,8 @@ class BaseXtremIODriverTestCase(test.TestCase):
                                 driver_ssl_cert_path='/test/path/root_ca.crt',
                                 xtremio_array_busy_retry_count=5,
                                 xtremio_array_busy_retry_interval=5,
-                                xtremio_clean_unused_ig=False)
+                                xtremio_clean_unused_ig=False,
+                                xtremio_max_parallel_requests=8)
 
         def safe_get(key):
             return getattr(self.config, key)
@@ -342,6 +346,7 @@ class BaseXtremIODriverTestCase(test.TestCase):
     def setUp(self):
         super(BaseXtremIODriverTestCase, self).setUp()
         clean_xms_data()
+        self.flags(state_path=self.useFixture(fixtures.TempDir()).path)
 
         self.driver = xtremio.XtremIOISCSIDriver(configuration=self.config)
         self.driver.client = xtremio.XtremIOClient42(self.config,
@@ -373,6 +378,13 @@ class XtremIODriverISCSITestCase(BaseXtremIODriverTestCase):
         self.assertEqual(self.driver.client.__class__.__name__,
                          'XtremIOClient4')
 
+    def test_check_for_setup_error_ver3(self, req):
+        req.side_effect = xms_request
+        xms_data['clusters'][1]['sys-sw-version'] = '3.0.0-44'
+        self.driver.check_for_setup_error()
+        self.assertEqual(self.driver.client.__class__.__name__,
+                         'XtremIOClient3')
+
     def test_fail_check_for_array_version(self, req):
         req.side_effect = xms_request
         cluster = xms_data['clusters'][1]
@@ -394,6 +406,16 @@ class XtremIODriverISCSITestCase(BaseXtremIODriverTestCase):
         self.assertEqual(self.driver.backend_name,
                          stats['volume_backend_name'])
 
+    def test_get_stats_cached(self, req):
+        req.side_effect = xms_request
+        with mock.patch.object(self.driver.client, 'get_cluster',
+                               return_value=xms_data['clusters'][1]) as gc:
+            self.driver.get_volume_stats(True)
+            self.driver.get_volume_stats(True)
+            self.assertEqual(1, gc.call_count)
+            self.driver._update_volume_stats(force=True)
+            self.assertEqual(2, gc.call_count)
+
 # ##### Volumes #####
     def test_create_volume_with_cg(self, req):
         req.side_effect = xms_request
@@ -508,6 +530,19 @@ class XtremIODriverISCSITestCase(BaseXtremIODriverTestCase):
         self.driver.create_cloned_volume(self.data.test_clone,
                                          self.data.test_volume)
 
+    def test_clone_volume_no_cache(self, req):
+        req.side_effect = xms_request
+        self.driver.db = mock.Mock()
+        (self.driver.db.
+         image_volume_cache_get_by_volume_id.return_value) = None
+        self.driver.create_volume(self.data.test_volume)
+        req.reset_mock()
+        self.driver.create_cloned_volume(self.data.test_clone,
+                                         self.data.test_volume)
+        self.assertNotIn(mock.call('volumes', name=self.data.test_volume['id'],
+                                   data={'prop': 'num-of-dest-snaps'}),
+                         req.call_args_list)
+
     def test_clone_volume_exceed_conf_limit(self, req):
         req.side_effect = xms_request
         self.driver.db = mock.Mock()
@@ -637,10 +672,47 @@ class XtremIODriverISCSITestCase(BaseXtremIODriverTestCase):
         portals = xms_data['iscsi-portals'].copy()
         xms_data['iscsi-portals'].clear()
         lunmap = {'lun': 4}
-        self.assertRaises(exception.VolumeDriverException,
-                          self.driver._get_iscsi_properties, lunmap)
+        with mock.patch.object(self.driver.client,
+                               'invalidate_cache') as invalidate_cache:
+            self.assertRaises(exception.VolumeDriverException,
+                              self.driver._get_iscsi_properties, lunmap)
+        invalidate_cache.assert_called_once_with('iscsi-portals')
         xms_data['iscsi-portals'] = portals
 
+    def test_create_ig(self, req):
+        req.side_effect = xms_request
+        ig = self.driver._create_ig('host1')
+        self.assertEqual('host1', ig['ig-id'][xtremio.XTREMIO_OID_NAME])
+        self.assertEqual(xms_data['initiator-groups'][ig['index']]['name'],
+                         'host1')
+        # no GET of the new IG
+        self.assertEqual(1, req.call_count)
+        self.assertEqual(('initiator-groups', 'POST'), req.call_args[0][:2])
+
+    def test_get_iscsi_properties(self, req):
+        req.side_effect = xms_request
+        props = self.driver._get_iscsi_properties({'lun': 4})
+        self.assertEqual('iqn.2008-05.com.xtremio:001e67939c34',
+                         props['target_iqn'])
+        self.assertEqual('10.205.68.5:3260', props['target_portal'])
+        self.assertEqual(['10.205.68.5:3260'], props['target_portals'])
+        self.assertEqual([4], props['target_luns'])
+
+    def test_get_iscsi_portals_v3_links_only(self, req):
+        portal = xms_data['iscsi-portals']['10.205.68.5/16']
+
+        def links_only_request(object_type, method='GET', data=None,
+                               name=None, idx=None, ver='v1'):
+            if name:
+                return {'content': portal}
+            return {'iscsi-portals': [{'href': '/iscsi-portals/1',
+                                       'name': portal['name']}]}
+        req.side_effect = links_only_request
+        client = xtremio.XtremIOClient3(self.config,
+                                        self.config.xtremio_cluster_name)
+        self.assertEqual([portal], client.get_iscsi_portals())
+        req.assert_called_with('iscsi-portals', name=portal['name'])
+
     def test_initialize_connection(self, req):
         req.side_effect = xms_request
         self.driver.create_volume(self.data.test_volume)
@@ -694,6 +766,20 @@ class XtremIODriverISCSITestCase(BaseXtremIODriverTestCase):
                           self.data.test_volume,
                           self.data.connector)
 
+    @mock.patch.object(xtremio.XtremIOVolumeDriver,
+                       '_get_ig_indexes_from_initiators',
+                       side_effect=exception.NotFound)
+    def test_terminate_connection_fail_on_igs_waits_volume(self, get_igs,
+                                                           req):
+        req.side_effect = xms_request
+        self.driver.create_volume(self.data.test_volume)
+        req.reset_mock()
+        self.assertRaises(exception.NotFound,
+                          self.driver.terminate_connection,
+                          self.data.test_volume,
+                          self.data.connector)
+        self.assertEqual('volumes', req.call_args[0][0])
+
     def test_get_ig_indexes_from_initiators_called_once(self, req):
         req.side_effect = xms_request
         self.driver.create_volume(self.data.test_volume)
@@ -720,6 +806,7 @@ class XtremIODriverISCSITestCase(BaseXtremIODriverTestCase):
         c1 = xms_data['clusters'][1]
         c1['chap-authentication-mode'] = 'initiator'
         c1['chap-discovery-mode'] = 'initiator'
+        self.driver._chap_modes_time -= xtremio.CHAP_MODES_TTL
         i1 = xms_data['initiators'][1]
         i1['ig-id'] = ['', i1['ig-id'], 1]
         i1['chap-authentication-initiator-password'] = 'chap_password1'
@@ -730,6 +817,71 @@ class XtremIODriverISCSITestCase(BaseXtremIODriverTestCase):
         self.assertEqual('chap_password2',
                          map_data['data']['discovery_auth_password'])
 
+    def test_initialize_connection_adds_missing_chap_password(self, req):
+        req.side_effect = xms_request
+        self.driver.create_volume(self.data.test_volume)
+        self.driver.create_volume(self.data.test_volume2)
+        self.driver.initialize_connection(self.data.test_volume,
+                                          self.data.connector)
+        c1 = xms_data['clusters'][1]
+        c1['chap-authentication-mode'] = 'initiator'
+        self.driver._chap_modes_time -= xtremio.CHAP_MODES_TTL
+        i1 = xms_data['initiators'][1]
+        i1['ig-id'] = ['', i1['ig-id'], 1]
+        i1['chap-authentication-initiator-password'] = None
+        i1['chap-discovery-initiator-password'] = None
+        map_data = self.driver.initialize_connection(self.data.test_volume2,
+                                                     self.data.connector)
+        self.assertIsNotNone(map_data['data']['auth_password'])
+        self.assertEqual(map_data['data']['auth_password'],
+                         i1['initiator-authentication-password'])
+        self.assertEqual(1, map_data['data']['target_lun'])
+
+    def _fail_chap_password_update(self, req):
+        self.driver._chap_modes_time -= xtremio.CHAP_MODES_TTL
+        xms_data['clusters'][1]['chap-authentication-mode'] = 'initiator'
+        i1 = xms_data['initiators'][1]
+        i1['ig-id'] = ['', i1['ig-id'], 1]
+        i1['chap-authentication-initiator-password'] = None
+        i1['chap-discovery-initiator-password'] = None
+
+        def put_fails(object_type, method='GET', *args, **kwargs):
+            if object_type == 'initiators' and method == 'PUT':
+                raise exception.VolumeBackendAPIException(data='')
+            return xms_request(object_type, method, *args, **kwargs)
+        req.side_effect = put_fails
+
+    def test_initialize_connection_chap_password_fails(self, req):
+        req.side_effect = xms_request
+        self.driver.create_volume(self.data.test_volume)
+        self.driver.create_volume(self.data.test_volume2)
+        self.driver.initialize_connection(self.data.test_volume,
+                                          self.data.connector)
+        self._fail_chap_password_update(req)
+        self.assertRaises(exception.VolumeBackendAPIException,
+                          self.driver.initialize_connection,
+                          self.data.test_volume2, self.data.connector)
+        self.assertEqual(1, len(xms_data['lun-maps']))
+
+    def test_initialize_connection_chap_password_fails_mapped(self, req):
+        req.side_effect = xms_request
+        self.driver.create_volume(self.data.test_volume)
+        self.driver.initialize_connection(self.data.test_volume,
+                                          self.data.connector)
+        self._fail_chap_password_update(req)
+        self.assertRaises(exception.VolumeBackendAPIException,
+                          self.driver.initialize_connection,
+                          self.data.test_volume, self.data.connector)
+        self.assertEqual(1, len(xms_data['lun-maps']))
+
+    def test_chap_modes_cached(self, req):
+        req.side_effect = xms_request
+        self.assertEqual((False, False), self.driver._get_chap_modes())
+        xms_data['clusters'][1]['chap-authentication-mode'] = 'initiator'
+        self.assertEqual((False, False), self.driver._get_chap_modes())
+        self.driver._chap_modes_time -= xtremio.CHAP_MODES_TTL
+        self.assertEqual((True, False), self.driver._get_chap_modes())
+
     def test_initialize_connection_after_disabling_chap(self, req):
         req.side_effect = xms_request
         self.driver.create_volume(self.data.test_volume)
@@ -765,6 +917,30 @@ class XtremIODriverISCSITestCase(BaseXtremIODriverTestCase):
         self.assertIn('initiator-discovery-password', data,
                       'Missing discovery password in data')
 
+    def test_get_password(self, req):
+        passwd = self.driver._get_password()
+        self.assertEqual(12, len(passwd))
+        self.assertTrue(passwd.isalnum())
+        self.assertEqual(passwd.upper(), passwd)
+
+    def test_get_cgsnap_name(self, req):
+        cgsnapshot = {'id': 'a-b-c', 'group_id': None,
+                      'consistencygroup_id': 'd-e'}
+        self.assertEqual('deabc', self.driver._get_cgsnap_name(cgsnapshot))
+        cgsnapshot['group_id'] = 'f-g'
+        self.assertEqual('fgabc', self.driver._get_cgsnap_name(cgsnapshot))
+
+    def test_req_many(self, req):
+        req.side_effect = xms_request
+        self.driver.create_volume(self.data.test_volume)
+        self.driver.create_volume(self.data.test_volume2)
+        res = self.driver.client.req_many(
+            [{'name': self.data.test_volume2['id']},
+             {'name': self.data.test_volume['id']}])
+        self.assertEqual([self.data.test_volume2['id'],
+                          self.data.test_volume['id']],
+                         [r['content']['name'] for r in res])
+
     def test_initialize_connection_bad_ig(self, req):
         req.side_effect = xms_bad_request
         self.assertRaises(exception.VolumeBackendAPIException,
@@ -1039,6 +1215,16 @@ class XtremIODriverISCSITestCase(BaseXtremIODriverTestCase):
                                                            [snapshot1])
         self.assertEqual((None, None), res)
 
+    def test_get_snapset_ancestors(self, req):
+        req.side_effect = [
+            {'content': {'vol-list': [['', 'snap1', 11], ['', 'snap2', 12]]}},
+            {'volumes': [{'ancestor-vol-id': ['', 'vol1', 1], 'index': 11},
+                         {'ancestor-vol-id': ['', 'vol2', 2], 'index': 12},
+                         {'ancestor-vol-id': ['', 'vol3', 3], 'index': 13}]}]
+        self.assertEqual({'vol1': 'snap1', 'vol2': 'snap2'},
+                         self.driver._get_snapset_ancestors('snapset'))
+        self.assertEqual(2, req.call_count)
+
     @mock.patch('cinder.objects.snapshot.SnapshotList.get_all_for_cgsnapshot')
     def test_cg_from_src_cg(self, get_all_for_cgsnapshot, req):
         req.side_effect = xms_request
@@ -1076,6 +1262,9 @@ class XtremIODriverISCSITestCase(BaseXtremIODriverTestCase):
                                                      [new_vol2],
                                                      None, None,
                                                      cg_obj, [new_vol1])
+        # the snapshot of the source volume was renamed to the new volume
+        self.assertEqual(xms_data['volumes'][2],
+                         get_xms_obj_by_name('volumes', new_vol2.id))
 
     @mock.patch('cinder.objects.snapshot.SnapshotList.get_all_for_cgsnapshot')
     def test_invalid_cg_from_src_input(self, get_all_for_cgsnapshot, req):
@@ -1300,7 +1489,8 @@ class XtremIODriverISCSITestCase(BaseXtremIODriverTestCase):
                           d.context, d.group, [], None, None, None, None)
 
 
-@mock.patch('requests.request')
+@mock.patch.object(xtremio, 'orjson', None)
+@mock.patch('requests.Session.request')
 class XtremIODriverTestCase(BaseXtremIODriverTestCase):
     # ##### XMS Client #####
     @mock.patch.object(time, 'sleep', mock.Mock(return_value=0))
@@ -1336,6 +1526,134 @@ class XtremIODriverTestCase(BaseXtremIODriverTestCase):
         req.side_effect = request_verify_cert
         self.driver.client.req('volumes')
 
+    def test_session_retries(self, req):
+        adapter = self.driver.client._session.get_adapter('https://xms')
+        self.assertEqual(xtremio.HTTP_RETRIES, adapter.max_retries.total)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+
+    def test_session_retries_only_get_on_status(self, req):
+        retries = self.driver.client._session.get_adapter(
+            'https://xms').max_retries
+        self.assertTrue(retries.is_retry('GET', 503))
+        for method in ('PUT', 'DELETE', 'POST'):
+            self.assertFalse(retries.is_retry(method, 503))
+
+    def test_concurrent_map_waits_all_on_failure(self, req):
+        done = []
+
+        def func(item):
+            if item < 2:
+                raise exception.NotFound()
+            eventlet.sleep(0)
+            done.append(item)
+            return item
+
+        self.assertEqual([2, 3], xtremio._concurrent_map(func, [2, 3], 2))
+        self.assertRaises(exception.NotFound, xtremio._concurrent_map,
+                          func, [0, 1, 2, 3], 4)
+        self.assertEqual([2, 3, 2, 3], done)
+
+    def test_spawn(self, req):
+        self.assertEqual(2, xtremio._spawn(lambda x: x + 1, 1)())
+        wait = xtremio._spawn(req, 'volumes')
+        req.side_effect = exception.NotFound
+        self.assertRaises(exception.NotFound, wait)
+
+    def test_get_request_has_no_body(self, req):
+        good_response = mock.MagicMock()
+        good_response.status_code = 200
+        req.return_value = good_response
+
+        self.driver.client.req('volumes', data={'prop': 'index'},
+                               name='vol1')
+        self.assertIsNone(req.call_args[1]['data'])
+        self.assertEqual('index', req.call_args[1]['params']['prop'])
+
+    def test_orjson(self, req):
+        good_response = mock.MagicMock()
+        good_response.status_code = 200
+        good_response.content = b'{"links": []}'
+        req.return_value = good_response
+
+        with mock.patch.object(xtremio, 'orjson') as orjson:
+            orjson.dumps.return_value = b'{}'
+            orjson.loads.return_value = {'links': []}
+            res = self.driver.client.req('volumes', 'POST', {})
+        self.assertEqual({'links': []}, res)
+        orjson.loads.assert_called_once_with(b'{"links": []}')
+        self.assertEqual(b'{}', req.call_args[1]['data'])
+
+    def test_metadata_cache(self, req):
+        good_response = mock.MagicMock()
+        good_response.status_code = 200
+        good_response.json.return_value = {'clusters': []}
+        req.return_value = good_response
+
+        self.driver.client.req('clusters')
+        self.driver.client.req('clusters')
+        self.assertEqual(1, req.call_count)
+        self.driver.client.req('clusters', 'PUT', {}, idx=1)
+        self.driver.client.req('clusters')
+        self.assertEqual(3, req.call_count)
+
+    @mock.patch.dict(xtremio.METADATA_CACHE_TTL, {'clusters': -1})
+    def test_metadata_cache_expired(self, req):
+        good_response = mock.MagicMock()
+        good_response.status_code = 200
+        good_response.json.return_value = {'clusters': []}
+        req.return_value = good_response
+
+        self.driver.client.req('clusters')
+        self.driver.client.req('clusters')
+        self.assertEqual(2, req.call_count)
+
+    def test_metadata_cache_returns_copies(self, req):
+        good_response = mock.MagicMock()
+        good_response.status_code = 200
+        good_response.json.return_value = {'clusters': []}
+        req.return_value = good_response
+
+        self.driver.client.req('clusters')['clusters'].append('changed')
+        self.assertEqual({'clusters': []}, self.driver.client.req('clusters'))
+        self.assertEqual(1, req.call_count)
+
+    def test_initiators_not_cached(self, req):
+        good_response = mock.MagicMock()
+        good_response.status_code = 200
+        good_response.json.return_value = {'initiators': []}
+        req.return_value = good_response
+
+        self.driver.client.req('initiators')
+        self.driver.client.req('initiators')
+        self.assertEqual(2, req.call_count)
+
+    def test_metadata_cache_persistent(self, req):
+        good_response = mock.MagicMock()
+        good_response.status_code = 200
+        good_response.json.return_value = {'iscsi-portals': []}
+        req.return_value = good_response
+
+        self.driver.client.req('iscsi-portals')
+        client = xtremio.XtremIOClient42(self.config,
+                                         self.config.xtremio_cluster_name)
+        self.assertEqual({'iscsi-portals': []}, client.req('iscsi-portals'))
+        self.assertEqual(1, req.call_count)
+
+        self.driver.client.req('iscsi-portals', 'DELETE', idx=1)
+        client = xtremio.XtremIOClient42(self.config,
+                                         self.config.xtremio_cluster_name)
+        client.req('iscsi-portals')
+        self.assertEqual(3, req.call_count)
+
+    def test_metadata_cache_corrupt_file(self, req):
+        path = self.useFixture(fixtures.TempDir()).join('cache.json')
+        for content in ('{}', '[[1, 2]]', '[[["a"], {}, "later"]]',
+                        '[[[["a"]], {}, 1e12]]', 'not json'):
+            with open(path, 'w') as f:
+                f.write(content)
+            cache = xtremio._MetadataCache(path=path)
+            self.assertIsNone(cache.get(('a',)))
+
 
 @mock.patch('cinder.volume.drivers.dell_emc.xtremio.XtremIOClient.req')
 class XtremIODriverFCTestCase(BaseXtremIODriverTestCase):
@@ -1352,6 +1670,74 @@ class XtremIODriverFCTestCase(BaseXtremIODriverTestCase):
         map_data = self.driver.initialize_connection(self.data.test_volume,
                                                      self.data.connector)
         self.assertEqual(1, map_data['data']['target_lun'])
+        targets = self.driver.get_targets()
+        self.assertEqual(targets, map_data['data']['target_wwn'])
+        self.assertEqual(dict.fromkeys(self.data.connector['wwpns'], targets),
+                         map_data['data']['initiator_target_map'])
+
+    def test_initialize_connection_some_initiators_known(self, req):
+        req.side_effect = xms_request
+        self.driver.create_volume(self.data.test_volume)
+        known = {'12:34:56:78:90:12:34:5': {'ig-id': ['', 'fakehost', 1]}}
+
+        with mock.patch.object(self.driver.client, 'get_initiator',
+                               side_effect=known.get) as get_initiator:
+            self.driver.initialize_connection(self.data.test_volume,
+                                              self.data.connector)
+        self.assertEqual(2, get_initiator.call_count)
+        self.assertEqual(['12:34:56:78:90:54:32:1'],
+                         [i['port-address']
+                          for i in xms_data['initiators'].values()])
+
+    @mock.patch.object(xtremio.XtremIOFCDriver, '_get_lun_num',
+                       return_value=5)
+    @mock.patch.object(xtremio.XtremIOFCDriver, 'create_lun_map',
+                       side_effect=lambda vol, ig, lun_num: {'lun': lun_num})
+    def test_initialize_connection_multiple_igs(self, create_lun_map,
+                                                get_lun_num, req):
+        req.side_effect = xms_request
+        inits = {'12:34:56:78:90:12:34:5': {'ig-id': ['', 'ig1', 1]},
+                 '12:34:56:78:90:54:32:1': {'ig-id': ['', 'ig2', 2]}}
+
+        with mock.patch.object(self.driver.client, 'get_initiator',
+                               side_effect=inits.get):
+            map_data = self.driver.initialize_connection(
+                self.data.test_volume, self.data.connector)
+        self.assertEqual(5, map_data['data']['target_lun'])
+        get_lun_num.assert_called_once_with(mock.ANY,
+                                            self.data.test_volume['id'])
+        self.assertEqual({'ig1', 'ig2'},
+                         set(get_lun_num.call_args[0][0]))
+        create_lun_map.assert_has_calls(
+            [mock.call(self.data.test_volume, 'ig1', 5),
+             mock.call(self.data.test_volume, 'ig2', 5)], any_order=True)
+
+    def test_initialize_connection_multiple_igs_one_mapped(self, req):
+        vol_name = self.data.test_volume['id']
+        mapped = {'ig1': [{'lun': 1, 'vol-name': 'other'},
+                          {'lun': 7, 'vol-name': vol_name}],
+                  'ig2': [{'lun': 2, 'vol-name': 'other'}]}
+        inits = {'12:34:56:78:90:12:34:5': {'ig-id': ['', 'ig1', 1]},
+                 '12:34:56:78:90:54:32:1': {'ig-id': ['', 'ig2', 2]}}
+
+        def lm_response(object_type, method='GET', data=None, *args,
+                        **kwargs):
+            if object_type == 'lun-maps' and method == 'GET':
+                return {'lun-maps': mapped[data['filter'].split(':')[-1]]}
+            return xms_request(object_type, method, data, *args, **kwargs)
+        req.side_effect = lm_response
+
+        with mock.patch.object(self.driver.client, 'get_initiator',
+                               side_effect=inits.get), \
+                mock.patch.object(self.driver, 'create_lun_map',
+                                  side_effect=lambda vol, ig, lun_num:
+                                  {'lun': lun_num}) as create_lun_map:
+            map_data = self.driver.initialize_connection(
+                self.data.test_volume, self.data.connector)
+        self.assertEqual(7, map_data['data']['target_lun'])
+        create_lun_map.assert_has_calls(
+            [mock.call(self.data.test_volume, 'ig1', 7),
+             mock.call(self.data.test_volume, 'ig2', 7)], any_order=True)
 
     def test_terminate_connection(self, req):
         req.side_effect = xms_request
@@ -1364,6 +1750,16 @@ class XtremIODriverFCTestCase(BaseXtremIODriverTestCase):
         self.driver.terminate_connection(self.data.test_volume,
                                          self.data.connector)
 
+    def test_get_ig_indexes_from_initiators(self, req):
+        req.side_effect = xms_request
+        self.driver.create_volume(self.data.test_volume)
+        self.driver.initialize_connection(self.data.test_volume,
+                                          self.data.connector)
+        for i1 in xms_data['initiators'].values():
+            i1['ig-id'] = ['', i1['ig-id'], 1]
+        self.assertEqual([1], self.driver._get_ig_indexes_from_initiators(
+            self.data.connector))
+
     def test_force_terminate_connection(self, req):
         req.side_effect = xms_request
         self.driver.create_volume(self.data.test_volume)
@@ -1416,12 +1812,63 @@ class XtremIODriverFCTestCase(BaseXtremIODriverTestCase):
             self.driver.client.get_initiators_igs(port_addresses)
 
     def test_get_free_lun(self, req):
-        def lm_response(*args, **kwargs):
-            return {'lun-maps': [{'lun': 1}]}
+        def lm_response(object_type, method='GET', data=None, *args,
+                        **kwargs):
+            if data['filter'] == 'ig-name:eq:test1':
+                return {'lun-maps': [{'lun': 1}, {'lun': 3}]}
+            return {'lun-maps': [{'lun': 2}]}
         req.side_effect = lm_response
 
         ig_names = ['test1', 'test2']
-        self.driver._get_free_lun(ig_names)
+        self.assertEqual(4, self.driver._get_lun_num(ig_names, 'vol1'))
+
+    def test_get_free_lun_gap(self, req):
+        req.return_value = {'lun-maps': [{'lun': 2}, {'lun': 4}]}
+        self.assertEqual(1, self.driver._get_lun_num(['test1'], 'vol1'))
+
+    def test_get_lun_num_already_mapped(self, req):
+        req.return_value = {'lun-maps': [{'lun': 2, 'vol-name': 'vol2'},
+                                         {'lun': 4, 'vol-name': 'vol1'}]}
+        self.assertEqual(4, self.driver._get_lun_num(['test1'], 'vol1'))
+
+    def test_get_targets_v3(self, req):
+        req.side_effect = xms_request
+        self.driver.client = xtremio.XtremIOClient3(
+            self.config, self.config.xtremio_cluster_name)
+        self.assertEqual(['21000024ff57b236', '21000024ff57b255'],
+                         sorted(self.driver.get_targets()))
+
+    @mock.patch.object(xtremio.eventlet, 'spawn_n')
+    def test_get_targets_refresh(self, spawn_n, req):
+        req.side_effect = xms_request
+        targets = self.driver.get_targets()
+        self.assertEqual(targets, self.driver.get_targets())
+        spawn_n.assert_not_called()
+
+        self.driver._targets_time -= xtremio.FC_TARGETS_TTL
+        xms_data['targets']['X1-SC2-target2']['port-state'] = 'down'
+        # the known targets are served while they are refreshed
+        self.assertEqual(targets, self.driver.get_targets())
+        spawn_n.assert_called_once_with(
+            self.driver._refresh_targets_in_background)
+        self.driver.get_targets()
+        self.assertEqual(1, spawn_n.call_count)
+
+        self.driver._refresh_targets_in_background()
+        self.assertEqual(['21000024ff57b236'], self.driver.get_targets())
+        self.assertFalse(self.driver._targets_refreshing)
+
+    def test_num_of_mapped_volumes_v3_full(self, req):
+        req.side_effect = xms_request
+        self.driver.client = xtremio.XtremIOClient3(
+            self.config, self.config.xtremio_cluster_name)
+        self.driver.create_volume(self.data.test_volume)
+        self.driver.initialize_connection(self.data.test_volume,
+                                          self.data.connector)
+        req.reset_mock()
+        self.assertEqual(1, self.driver.client.num_of_mapped_volumes(
+            self.driver._get_ig_name(self.data.connector)))
+        req.assert_called_once_with('lun-maps', data={'full': 1})
 
     def test_race_on_terminate_connection(self, req):
         """Test for race conditions on num_of_mapped_volumes.
@@ -50,6 +50,10 @@ class UnityThinCloneLimitExceededError(StoropsException):
     pass
 
 
+class UnityHostInitiatorExistedError(StoropsException):
+    pass
+
+
 class ExtendLunError(Exception):
     pass
 
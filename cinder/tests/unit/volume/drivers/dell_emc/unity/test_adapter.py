@@ -94,6 +94,10 @@ class MockClient(object):
             ret = test_client.MockResource(_id=lun_id, name=name)
         return ret
 
+    @staticmethod
+    def rename_lun(lun, name):
+        lun.modify(name=name)
+
     @staticmethod
     def delete_lun(lun_id):
         if lun_id != 'lun_4':
@@ -317,6 +317,24 @@ class ClientTest(unittest.TestCase):
     def test_get_serial(self):
         self.assertEqual('SYSTEM_SERIAL', self.client.get_serial())
 
+    def test_get_serial_cached(self):
+        self.assertEqual('SYSTEM_SERIAL', self.client.get_serial())
+        self.client.system.serial_number = 'ANOTHER_SERIAL'
+        self.assertEqual('SYSTEM_SERIAL', self.client.get_serial())
+
+    @mock.patch.dict(client._SYSTEM_POOL, clear=True)
+    @mock.patch.object(client, 'storops')
+    def test_system_shared(self, mocked_storops):
+        mocked_storops.UnitySystem.side_effect = lambda **kwargs: mock.Mock()
+        client_1 = client.UnityClient('1.2.3.5', 'user', 'pass')
+        client_2 = client.UnityClient('1.2.3.5', 'user', 'pass')
+        client_3 = client.UnityClient('1.2.3.5', 'admin', 'pass')
+        self.assertIs(client_1.system, client_2.system)
+        self.assertIsNot(client_1.system, client_3.system)
+        self.assertEqual(2, mocked_storops.UnitySystem.call_count)
+        self.assertNotIn('pass', [field for key in client._SYSTEM_POOL
+                                  for field in key])
+
     def test_create_lun_success(self):
         name = 'LUN 3'
         pool = MockResource('Pool 0')
@@ -377,6 +395,33 @@ class ClientTest(unittest.TestCase):
         ret = self.client.get_lun(lun_id='not_found')
         self.assertIsNone(ret)
 
+    def test_get_lun_cached(self):
+        lun = self.client.get_lun(name='LUN 5')
+        self.assertIs(lun, self.client.get_lun(name='LUN 5'))
+
+    def test_get_lun_with_id_not_cached(self):
+        lun = self.client.get_lun('lun5')
+        self.assertIsNot(lun, self.client.get_lun('lun5'))
+
+    @mock.patch.object(client, 'RESOURCE_CACHE_TTL', new=-1)
+    def test_get_lun_cache_expired(self):
+        lun = self.client.get_lun(name='LUN 5')
+        self.assertIsNot(lun, self.client.get_lun(name='LUN 5'))
+
+    def test_delete_lun_invalidate_cache(self):
+        lun = self.client.get_lun(name='LUN 5')
+        lun._id = 'lun5'
+        self.client.delete_lun('lun5')
+        self.assertIsNot(lun, self.client.get_lun(name='LUN 5'))
+
+    def test_run_many(self):
+        ret = self.client.run_many([('get_lun', {'lun_id': 'lun6'}),
+                                    ('get_lun', {'name': 'LUN 6'}),
+                                    ('delete_lun', {'lun_id': 'lun6'})])
+        self.assertEqual('lun6', ret[0].get_id())
+        self.assertEqual('LUN 6', ret[1].name)
+        self.assertIsNone(ret[2])
+
     def test_get_pools(self):
         pools = self.client.get_pools()
         self.assertEqual(2, len(pools))
@@ -425,6 +470,12 @@ class ClientTest(unittest.TestCase):
         ret = self.client.get_snap('not_found')
         self.assertIsNone(ret)
 
+    def test_delete_snap_invalidate_cache(self):
+        snap = self.client.get_snap('snap_3')
+        snap._id = 'snap_3'
+        self.client.delete_snap(snap)
+        self.assertIsNot(snap, self.client.get_snap('snap_3'))
+
     @mock.patch.object(coordination.Coordinator, 'get_lock')
     def test_create_host_found(self, fake_coordination):
         host = self.client.create_host('host1')
@@ -443,6 +494,25 @@ class ClientTest(unittest.TestCase):
         host = MockResource('host1')
         self.assertEqual(1, self.client.attach(host, lun))
 
+    def test_attach_invalidate_cache(self):
+        snap = self.client.get_snap('snap_attach')
+        snap._id = 'snap_attach'
+        self.client.attach(MockResource('host1'), snap)
+        self.assertIsNot(snap, self.client.get_snap('snap_attach'))
+
+    def test_detach_invalidate_cache(self):
+        lun = self.client.get_lun(name='LUN 9')
+        lun._id = 'lun9'
+        self.client.detach(MockResource('host1'), lun)
+        self.assertIsNot(lun, self.client.get_lun(name='LUN 9'))
+
+    def test_rename_lun(self):
+        lun = self.client.get_lun(name='LUN 8')
+        lun._id = 'lun8'
+        self.client.rename_lun(lun, 'volume-8')
+        self.assertEqual('volume-8', lun.name)
+        self.assertIsNot(lun, self.client.get_lun(name='LUN 8'))
+
     def test_attach_already_attached(self):
         lun = MockResource(_id='already_attached')
         host = MockResource('host1')
@@ -479,6 +549,24 @@ class ClientTest(unittest.TestCase):
         host = MockResource(name='host_init')
         host = self.client.update_host_initiators(host, 'fake-iqn-1')
 
+    def test_update_host_initiators_multiple(self):
+        host = MockResource(name='host_init')
+        uids = ['fake-iqn-1', 'fake-iqn-2', 'fake-iqn-3']
+        host = self.client.update_host_initiators(host, uids)
+        self.assertEqual(sorted(uids), sorted(host.initiator_id))
+        self.assertIs(host, self.client.host_cache['host_init'])
+
+    def test_update_host_initiators_existed(self):
+        host = mock.Mock()
+        host.name = 'host_init'
+        host.fc_host_initiators = None
+        host.iscsi_host_initiators = None
+        host.add_initiator.side_effect = ex.UnityHostInitiatorExistedError
+        self.client.update_host_initiators(host, ['fake-iqn-1'])
+        host.add_initiator.assert_called_once_with('fake-iqn-1',
+                                                   force_create=True)
+        host.update.assert_not_called()
+
     def test_get_iscsi_target_info(self):
         ret = self.client.get_iscsi_target_info()
         expected = [{'iqn': 'iqn.1-1.com.e:c.p0.0', 'portal': '1.1.1.1:3260'},
@@ -520,6 +608,17 @@ class ClientTest(unittest.TestCase):
         self.assertEqual('max_2_mbps', limit.name)
         self.assertEqual(2, limit.max_kbps)
 
+    def test_get_io_limit_policy_cached(self):
+        specs = {'maxBWS': 2, 'id': 'max_2_mbps', 'maxIOPS': None}
+        limit = self.client.get_io_limit_policy(specs)
+        self.assertIs(limit, self.client.get_io_limit_policy(specs))
+
+    @mock.patch.object(client, 'RESOURCE_CACHE_TTL', new=-1)
+    def test_get_io_limit_policy_cache_expired(self):
+        specs = {'maxBWS': 2, 'id': 'max_2_mbps', 'maxIOPS': None}
+        limit = self.client.get_io_limit_policy(specs)
+        self.assertIsNot(limit, self.client.get_io_limit_policy(specs))
+
     def test_create_io_limit_policy_success(self):
         limit = self.client.create_io_limit_policy('3kiops', max_iops=3000)
         self.assertEqual('3kiops', limit.name)
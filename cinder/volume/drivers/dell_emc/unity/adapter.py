@@ -462,7 +462,7 @@ class CommonAdapter(object):
         }
         """
         lun = self._get_referenced_lun(existing_ref)
-        lun.modify(name=volume.name)
+        self.client.rename_lun(lun, volume.name)
         return {
             'provider_location':
                 self._build_provider_location(lun_id=lun.get_id(),
@@ -13,9 +13,16 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import collections
+import functools
+import hashlib
+import threading
+
+from eventlet import greenpool
 from oslo_log import log
 from oslo_utils import excutils
 from oslo_utils import importutils
+from oslo_utils import timeutils
 
 storops = importutils.try_import('storops')
 if storops:
@@ -31,6 +38,18 @@ from cinder.volume.drivers.dell_emc.unity import utils
 
 LOG = log.getLogger(__name__)
 
+# Resources looked up within RESOURCE_CACHE_TTL seconds are served from memory
+# instead of issuing another REST call to the array.
+RESOURCE_CACHE_TTL = 5
+RESOURCE_CACHE_SIZE = 512
+# Max number of REST calls issued to the array concurrently.
+MAX_CONCURRENT_REQUESTS = 8
+
+# UnitySystem objects shared by the clients connecting to the same array with
+# the same credentials, so that they reuse one authenticated session.
+_SYSTEM_POOL = {}
+_SYSTEM_POOL_LOCK = threading.Lock()
+
 
 class UnityClient(object):
     def __init__(self, host, username, password, verify_cert=True):
@@ -44,17 +63,83 @@ class UnityClient(object):
         self.password = password
         self.verify_cert = verify_cert
         self.host_cache = {}
+        self._serial = None
+        self._resource_cache = collections.OrderedDict()
+        self._resource_cache_lock = threading.RLock()
+
+    @property
+    def _system_key(self):
+        # The pool lives as long as the process, keep no password in it.
+        password_hash = hashlib.sha256(
+            (self.password or '').encode('utf-8')).hexdigest()
+        return self.host, self.username, password_hash, self.verify_cert
 
     @property
     def system(self):
         if self._system is None:
-            self._system = storops.UnitySystem(
-                host=self.host, username=self.username, password=self.password,
-                verify=self.verify_cert)
+            with _SYSTEM_POOL_LOCK:
+                system = _SYSTEM_POOL.get(self._system_key)
+                if system is None:
+                    system = storops.UnitySystem(
+                        host=self.host, username=self.username,
+                        password=self.password, verify=self.verify_cert)
+                    _SYSTEM_POOL[self._system_key] = system
+            self._system = system
         return self._system
 
+    def _cached(self, kind, key, loader):
+        """Returns the cached resource or loads and caches it.
+
+        :param kind: resource type of the cache key, like 'lun_name' or 'snap'
+        :param key: name of the resource
+        :param loader: function called to get the resource on cache miss
+        :return: the resource returned by `loader`
+        """
+        cache_key = (kind, key)
+        with self._resource_cache_lock:
+            entry = self._resource_cache.pop(cache_key, None)
+            if entry is not None:
+                rsc, expire_at = entry
+                if timeutils.now() < expire_at:
+                    # Re-insert to keep the most recently used at the end.
+                    self._resource_cache[cache_key] = entry
+                    return rsc
+
+        rsc = loader()
+        with self._resource_cache_lock:
+            self._resource_cache[cache_key] = (
+                rsc, timeutils.now() + RESOURCE_CACHE_TTL)
+            while len(self._resource_cache) > RESOURCE_CACHE_SIZE:
+                self._resource_cache.popitem(last=False)
+        return rsc
+
+    def _invalidate(self, kind, key):
+        with self._resource_cache_lock:
+            self._resource_cache.pop((kind, key), None)
+
+    def _invalidate_by_id(self, rsc_id, *kinds):
+        """Drops the resource cached by name given its id."""
+        with self._resource_cache_lock:
+            for cache_key, (rsc, __) in list(self._resource_cache.items()):
+                if cache_key[0] in kinds and rsc.get_id() == rsc_id:
+                    del self._resource_cache[cache_key]
+
+    def run_many(self, ops):
+        """Runs independent client operations concurrently.
+
+        :param ops: list of (method_name, kwargs) tuples, like
+                    [('delete_lun', {'lun_id': 'sv_1'}), ...]
+        :return: list of the results, in the same order as `ops`
+        """
+        pool = greenpool.GreenPool(MAX_CONCURRENT_REQUESTS)
+        return list(pool.imap(
+            lambda op: getattr(self, op[0])(**op[1]), ops))
+
     def get_serial(self):
-        return self.system.serial_number
+        # The serial number of the array never changes.
+        if self._serial is None:
+            self._serial = self.system.serial_number
+        return self._serial
 
     def create_lun(self, name, size, pool, description=None,
                    io_limit_policy=None):
@@ -88,7 +173,7 @@ class UnityClient(object):
                       "Return the existing one.", name)
             lun = self.system.get_lun(name=name)
         if new_size_gb is not None and new_size_gb > lun.total_size_gb:
-            lun = self.extend_lun(lun.get_id(), new_size_gb)
+            lun = self._extend_lun(lun, new_size_gb)
         return lun
 
     def delete_lun(self, lun_id):
@@ -102,6 +187,7 @@ class UnityClient(object):
         except storops_ex.UnityResourceNotFoundError:
             LOG.debug("LUN %s doesn't exist. Deletion is not needed.",
                       lun_id)
+        self._invalidate_by_id(lun_id, 'lun_name')
 
     def get_lun(self, lun_id=None, name=None):
         """Gets LUN on the Unity system.
@@ -110,28 +196,46 @@ class UnityClient(object):
         :param name: name of the LUN
         :return: `UnityLun` object
         """
-        lun = None
         if lun_id is None and name is None:
             LOG.warning(
                 "Both lun_id and name are None to get LUN. Return None.")
-        else:
-            try:
-                lun = self.system.get_lun(_id=lun_id, name=name)
-            except storops_ex.UnityResourceNotFoundError:
-                LOG.warning(
-                    "LUN id=%(id)s, name=%(name)s doesn't exist.",
-                    {'id': lun_id, 'name': name})
-        return lun
+            return None
+
+        try:
+            if lun_id is not None:
+                # Getting by id issues no REST call until a property is read,
+                # so there is nothing worth caching.
+                return self.system.get_lun(_id=lun_id)
+            return self._cached('lun_name', name,
+                                lambda: self.system.get_lun(name=name))
+        except storops_ex.UnityResourceNotFoundError:
+            LOG.warning(
+                "LUN id=%(id)s, name=%(name)s doesn't exist.",
+                {'id': lun_id, 'name': name})
+            return None
 
     def extend_lun(self, lun_id, size_gib):
-        lun = self.system.get_lun(lun_id)
+        lun = self.system.get_lun(_id=lun_id)
+        return self._extend_lun(lun, size_gib)
+
+    def _extend_lun(self, lun, size_gib):
         try:
             lun.total_size_gb = size_gib
         except storops_ex.UnityNothingToModifyError:
             LOG.debug("LUN %s is already expanded. LUN expand is not needed.",
-                      lun_id)
+                      lun.get_id())
+        self._invalidate_by_id(lun.get_id(), 'lun_name')
         return lun
 
+    def rename_lun(self, lun, name):
+        """Renames a `UnityLun` on the Unity system.
+
+        :param lun: `UnityLun` object
+        :param name: new name of the LUN
+        """
+        lun.modify(name=name)
+        self._invalidate_by_id(lun.get_id(), 'lun_name')
+
     def get_pools(self):
         """Gets all storage pools on the Unity system.
 
@@ -157,14 +261,16 @@ class UnityClient(object):
                  'lun_id': src_lun_id,
                  'err': err})
             snap = self.get_snap(name=name)
+        else:
+            self._invalidate('snap', name)
         return snap
 
-    @staticmethod
-    def delete_snap(snap):
+    def delete_snap(self, snap):
         if snap is None:
             LOG.debug("Snap to delete is None, skipping deletion.")
             return
 
+        self._invalidate_by_id(snap.get_id(), 'snap')
         try:
             snap.delete()
         except storops_ex.UnityResourceNotFoundError as err:
@@ -180,7 +286,8 @@ class UnityClient(object):
 
     def get_snap(self, name=None):
         try:
-            return self.system.get_snap(name=name)
+            return self._cached('snap', name,
+                                lambda: self.system.get_snap(name=name))
         except storops_ex.UnityResourceNotFoundError as err:
             LOG.warning("Snapshot %(name)s doesn't exist. Message: %(err)s",
                         {'name': name, 'err': err})
@@ -202,23 +309,40 @@ class UnityClient(object):
             host = self.host_cache[name]
         return host
 
+    @staticmethod
+    def _add_initiator(host, uid):
+        """Adds the uid to the host.
+
+        :return: True if the uid is added, False if it was already in the host
+        """
+        try:
+            host.add_initiator(uid, force_create=True)
+        except storops_ex.UnityHostInitiatorExistedError:
+            # This make concurrent modification of
+            # host initiators safe
+            LOG.debug(
+                'The uid(%s) was already in '
+                '%s.', uid, host.name)
+            return False
+        return True
+
     def update_host_initiators(self, host, uids):
         """Updates host with the supplied uids."""
-        host_initiators_ids = self.get_host_initiator_ids(host)
+        host_initiators_ids = set(self.get_host_initiator_ids(host))
         un_registered = [h for h in uids if h not in host_initiators_ids]
         if un_registered:
-            for uid in un_registered:
-                try:
-                    host.add_initiator(uid, force_create=True)
-                except storops_ex.UnityHostInitiatorExistedError:
-                    # This make concurrent modification of
-                    # host initiators safe
-                    LOG.debug(
-                        'The uid(%s) was already in '
-                        '%s.', uid, host.name)
-            host.update()
-            # Update host cached with new initiators.
-            self.host_cache[host.name] = host
+            # Register the initiators concurrently, the round-trips to the
+            # array are independent of each other.
+            pool = greenpool.GreenPool(MAX_CONCURRENT_REQUESTS)
+            added = list(pool.imap(functools.partial(self._add_initiator,
+                                                     host),
+                                   un_registered))
+            # No need to refresh the host if all the uids were registered
+            # by others in the meantime.
+            if any(added):
+                host.update()
+                # Update host cached with new initiators.
+                self.host_cache[host.name] = host
 
         return host
 
@@ -230,8 +354,7 @@ class UnityClient(object):
         iscsi_ids = [] if iscsi is None else iscsi.initiator_id
         return fc_ids + iscsi_ids
 
-    @staticmethod
-    def attach(host, lun_or_snap):
+    def attach(self, host, lun_or_snap):
         """Attaches a `UnityLun` or `UnitySnap` to a `UnityHost`.
 
         :param host: `UnityHost` object
@@ -242,25 +365,33 @@ class UnityClient(object):
             return host.attach(lun_or_snap, skip_hlu_0=True)
         except storops_ex.UnityResourceAlreadyAttachedError:
             return host.get_hlu(lun_or_snap)
+        finally:
+            # The host access list of the object is outdated now, the next
+            # attach must not build on it.
+            self._invalidate_by_id(lun_or_snap.get_id(), 'lun_name', 'snap')
 
-    @staticmethod
-    def detach(host, lun_or_snap):
+    def detach(self, host, lun_or_snap):
         """Detaches a `UnityLun` or `UnitySnap` from a `UnityHost`.
 
         :param host: `UnityHost` object
         :param lun_or_snap: `UnityLun` object
         """
         lun_or_snap.update()
-        host.detach(lun_or_snap)
+        try:
+            host.detach(lun_or_snap)
+        finally:
+            self._invalidate_by_id(lun_or_snap.get_id(), 'lun_name', 'snap')
 
-    @staticmethod
-    def detach_all(lun):
+    def detach_all(self, lun):
         """Detaches a `UnityLun` from all hosts.
 
         :param lun: `UnityLun` object
         """
         lun.update()
-        lun.detach_from(host=None)
+        try:
+            lun.detach_from(host=None)
+        finally:
+            self._invalidate_by_id(lun.get_id(), 'lun_name')
 
     def get_ethernet_ports(self):
         return self.system.get_ethernet_port()
@@ -268,9 +399,15 @@ class UnityClient(object):
     def get_iscsi_target_info(self, allowed_ports=None):
         portals = self.system.get_iscsi_portal()
         portals = portals.shadow_copy(port_ids=allowed_ports)
-        return [{'portal': utils.convert_ip_to_portal(p.ip_address),
-                 'iqn': p.iscsi_node.name}
-                for p in portals]
+        # `iscsi_node` is lazily loaded by storops, one GET per portal, so
+        # resolve the portals concurrently.
+        pool = greenpool.GreenPool(MAX_CONCURRENT_REQUESTS)
+        return list(pool.imap(self._get_portal_info, portals))
+
+    @staticmethod
+    def _get_portal_info(portal):
+        return {'portal': utils.convert_ip_to_portal(portal.ip_address),
+                'iqn': portal.iscsi_node.name}
 
     def get_fc_ports(self):
         return self.system.get_fc_port()
@@ -287,22 +424,16 @@ class UnityClient(object):
          This function removes the colons and returns the last 16 bits:
          5006016C09200925.
         """
-        wwns = set()
         if logged_in_only:
-            for paths in filter(None, host.fc_host_initiators.paths):
-                paths = paths.shadow_copy(is_logged_in=True)
-                # `paths.fc_port` is just a list, not a UnityFcPortList,
-                # so use filter instead of shadow_copy here.
-                wwns.update(p.wwn.upper()
-                            for p in filter(
-                                lambda fcp: (allowed_ports is None or
-                                             fcp.get_id() in allowed_ports),
-                                paths.fc_port))
+            # `paths.fc_port` is just a list, not a UnityFcPortList,
+            # so filter the allowed ports here instead of shadow_copy.
+            ports = (fcp
+                     for paths in filter(None, host.fc_host_initiators.paths)
+                     for fcp in paths.shadow_copy(is_logged_in=True).fc_port
+                     if allowed_ports is None or fcp.get_id() in allowed_ports)
         else:
-            ports = self.get_fc_ports()
-            ports = ports.shadow_copy(port_ids=allowed_ports)
-            wwns.update(p.wwn.upper() for p in ports)
-        return [wwn.replace(':', '')[16:] for wwn in wwns]
+            ports = self.get_fc_ports().shadow_copy(port_ids=allowed_ports)
+        return list({p.wwn.replace(':', '')[16:].upper() for p in ports})
 
     def create_io_limit_policy(self, name, max_iops=None, max_kbps=None):
         try:
@@ -315,14 +446,20 @@ class UnityClient(object):
     def get_io_limit_policy(self, qos_specs):
         limit_policy = None
         if qos_specs is not None:
-            limit_policy = self.create_io_limit_policy(
-                qos_specs['id'],
-                qos_specs.get(utils.QOS_MAX_IOPS),
-                qos_specs.get(utils.QOS_MAX_BWS))
+            # The policy is named by the qos specs id. Once it is created, the
+            # existing one is always returned for the same id, so cache it
+            # instead of trying to create it again for every LUN.
+            limit_policy = self._cached(
+                'io_limit_policy', qos_specs['id'],
+                lambda: self.create_io_limit_policy(
+                    qos_specs['id'],
+                    qos_specs.get(utils.QOS_MAX_IOPS),
+                    qos_specs.get(utils.QOS_MAX_BWS)))
         return limit_policy
 
     def get_pool_name(self, lun_name):
-        lun = self.system.get_lun(name=lun_name)
+        lun = self._cached('lun_name', lun_name,
+                           lambda: self.system.get_lun(name=lun_name))
         return lun.pool_name
 
     def restore_snapshot(self, snap_name):
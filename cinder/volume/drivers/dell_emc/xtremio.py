@@ -32,16 +32,28 @@ supported XtremIO version 2.4 and up
   1.0.10 - option to clean unused IGs
 """
 
+import base64
+import collections
+import copy
+import hashlib
 import json
 import math
+import os
 import random
 import requests
-import string
+import sys
+import time
 
+import eventlet
+from eventlet import greenpool
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_utils import excutils
+from oslo_utils import importutils
 from oslo_utils import strutils
+from oslo_utils import timeutils
 from oslo_utils import units
+from requests.packages.urllib3.util import retry
 import six
 from six.moves import http_client
 
@@ -57,6 +69,7 @@ from cinder.volume.drivers.san import san
 from cinder.volume import utils as vutils
 from cinder.zonemanager import utils as fczm_utils
 
+orjson = importutils.try_import('orjson')
 
 LOG = logging.getLogger(__name__)
 
@@ -83,7 +96,13 @@ XTREMIO_OPTS = [
                      'the IG be, we default to False (not deleting IGs '
                      'without connected volumes); setting this parameter '
                      'to True will remove any IG after terminating its '
-                     'connection to the last volume.')]
+                     'connection to the last volume.'),
+    cfg.IntOpt('xtremio_max_parallel_requests',
+               default=8,
+               min=1,
+               help='Maximum number of requests the driver sends to the XMS '
+                    'at the same time when an operation involves several '
+                    'independent objects.')]
 
 CONF.register_opts(XTREMIO_OPTS, group=configuration.SHARED_CONF_GROUP)
 
@@ -96,11 +115,198 @@ SYSTEM_BUSY = 'system_is_busy'
 TOO_MANY_OBJECTS = 'too_many_objs'
 TOO_MANY_SNAPSHOTS_PER_VOL = 'too_many_snapshots_per_vol'
 
+# XMS error messages which simply translate to an exception
+ERR_EXCEPTIONS = {SYSTEM_BUSY: exception.XtremIOArrayBusy,
+                  TOO_MANY_OBJECTS: exception.XtremIOSnapshotsLimitExceeded,
+                  TOO_MANY_SNAPSHOTS_PER_VOL:
+                      exception.XtremIOSnapshotsLimitExceeded}
+
 
 XTREMIO_OID_NAME = 1
 XTREMIO_OID_INDEX = 2
 
 
+def _eq_filter(field, value):
+    """Returns the XMS filter matching objects with field equal to value."""
+    return '%s:eq:%s' % (field, value)
+
+
+def _vol_size(size_gb):
+    """Returns the XMS vol-size value of a size in GiB."""
+    return '%dg' % size_gb
+
+
+def _colon_wwpn(wwpn):
+    """Returns the WWPN in the colon separated notation of the XMS."""
+    if ':' in wwpn:
+        return wwpn
+    # join builds a list out of a generator anyway
+    return ':'.join([wwpn[i:i + 2] for i in range(0, len(wwpn), 2)])
+
+
+def _json_dumps(data):
+    if orjson:
+        return orjson.dumps(data)
+    return json.dumps(data)
+
+
+def _json_loads(response):
+    if orjson:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def _call(func, *args, **kwargs):
+    """Returns the result of func, and the exc_info of what it raised."""
+    try:
+        return func(*args, **kwargs), None
+    except Exception:
+        return None, sys.exc_info()
+
+
+def _spawn(func, *args, **kwargs):
+    """Runs func in a green thread, returns a function waiting for it.
+
+    What func raises is re-raised by the waiting function in the caller,
+    instead of being printed by the eventlet hub.
+    """
+    thread = eventlet.spawn(_call, func, *args, **kwargs)
+
+    def wait():
+        result, exc_info = thread.wait()
+        if exc_info:
+            six.reraise(*exc_info)
+        return result
+    return wait
+
+
+def _concurrent_map(func, items, size):
+    """Calls func on each of the items concurrently, keeping their order.
+
+    At most size calls run at the same time. If some of them fail, the first
+    failure is re-raised once all the calls are done, so none is left running
+    unobserved, and the others are logged.
+    """
+    pool = greenpool.GreenPool(size)
+    results = list(pool.imap(lambda item: _call(func, item), items))
+    failures = [exc_info for __, exc_info in results if exc_info]
+    for exc_info in failures[1:]:
+        LOG.error('Concurrent call failed: %s', exc_info[1],
+                  exc_info=exc_info)
+    if failures:
+        six.reraise(*failures[0])
+    return [result for result, __ in results]
+
+
+# Seconds for which the iSCSI driver reuses the cluster's CHAP modes.
+CHAP_MODES_TTL = 60
+
+# Seconds after which the FC driver refreshes its list of up target ports.
+# Until the refresh is done the previous list keeps being used.
+FC_TARGETS_TTL = 300
+
+# Retries of requests failing to connect or answered by an unavailable
+# gateway. Any request that failed to connect is retried, but only GETs are
+# resent after reaching the XMS: PUTs and DELETEs address objects by name,
+# so resending one that took effect would fail with obj_not_found.
+HTTP_RETRIES = 3
+HTTP_RETRY_BACKOFF = 0.2
+HTTP_RETRY_METHODS = frozenset(['GET'])
+HTTP_RETRY_STATUSES = (http_client.BAD_GATEWAY,
+                       http_client.SERVICE_UNAVAILABLE,
+                       http_client.GATEWAY_TIMEOUT)
+
+
+def _http_retry():
+    kwargs = {'total': HTTP_RETRIES,
+              'backoff_factor': HTTP_RETRY_BACKOFF,
+              'status_forcelist': HTTP_RETRY_STATUSES,
+              'raise_on_status': False}
+    try:
+        return retry.Retry(allowed_methods=HTTP_RETRY_METHODS, **kwargs)
+    except TypeError:
+        # urllib3 older than 1.26
+        return retry.Retry(method_whitelist=HTTP_RETRY_METHODS, **kwargs)
+
+
+# Seconds for which the volume stats are reused instead of being refreshed.
+STATS_TTL = 10
+
+# Seconds for which GET responses of the read-mostly object types are served
+# from memory. Any change made through the client to an object type drops
+# its cached responses. Object types other processes may change under us,
+# like initiators and IGs, are never cached.
+METADATA_CACHE_TTL = {'clusters': 5,
+                      'iscsi-portals': 300}
+METADATA_CACHE_SIZE = 512
+# Object types whose cached responses are also kept in a file under
+# state_path, so a restarted service doesn't have to fetch them again.
+METADATA_CACHE_PERSISTENT = ('iscsi-portals',)
+
+
+class _MetadataCache(object):
+    """LRU cache of XMS responses expiring after a per object type TTL."""
+
+    def __init__(self, size=METADATA_CACHE_SIZE, path=None):
+        self._size = size
+        self._entries = collections.OrderedDict()
+        self._path = path
+        if path:
+            self._load()
+
+    def _load(self):
+        now, wall_now = timeutils.now(), time.time()
+        loaded = collections.OrderedDict()
+        try:
+            with open(self._path) as f:
+                entries = json.load(f)
+            for key, value, expiry in entries[-self._size:]:
+                if expiry > wall_now:
+                    loaded[tuple(key)] = (value, expiry - wall_now + now)
+        except (IOError, OSError, TypeError, ValueError):
+            # a missing or malformed file just means starting with no cache
+            return
+        self._entries = loaded
+
+    def _save(self):
+        # expiry times are monotonic, the file needs wall clock ones
+        now, wall_now = timeutils.now(), time.time()
+        entries = [[key, value, expiry - now + wall_now]
+                   for key, (value, expiry) in self._entries.items()
+                   if key[0] in METADATA_CACHE_PERSISTENT and expiry > now]
+        tmp_path = '%s.%d' % (self._path, os.getpid())
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f)
+            os.rename(tmp_path, self._path)
+        except (IOError, OSError) as exc:
+            LOG.warning('Failed to save the XMS metadata cache to %(path)s: '
+                        '%(exc)s', {'path': self._path, 'exc': exc})
+
+    def get(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None or timeutils.now() >= entry[1]:
+            return None
+        self._entries[key] = entry
+        # callers may change what they get, keep the cached one intact
+        return copy.deepcopy(entry[0])
+
+    def put(self, key, value, ttl):
+        self._entries.pop(key, None)
+        self._entries[key] = (copy.deepcopy(value), timeutils.now() + ttl)
+        while len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+        if self._path and key[0] in METADATA_CACHE_PERSISTENT:
+            self._save()
+
+    def invalidate(self, object_type):
+        for key in list(self._entries):
+            if key[0] == object_type:
+                del self._entries[key]
+        if self._path and object_type in METADATA_CACHE_PERSISTENT:
+            self._save()
+
+
 class XtremIOClient(object):
     def __init__(self, configuration, cluster_id):
         self.configuration = configuration
@@ -112,12 +318,46 @@ class XtremIOClient(object):
                            safe_get('driver_ssl_cert_path') or None)
             if verify_path:
                 self.verify = verify_path
+        self._base_urls = {
+            'v1': 'https://%s/api/json/types' % self.configuration.san_ip,
+            'v2': 'https://%s/api/json/v2/types' % self.configuration.san_ip}
+        cache_id = hashlib.sha1(('%s/%s' % (self.configuration.san_ip,
+                                            cluster_id)).encode('utf-8'))
+        self._metadata_cache = _MetadataCache(path=os.path.join(
+            CONF.state_path, 'xtremio-%s.json' % cache_id.hexdigest()))
+        # keep the connections to the XMS open between requests, and retry
+        # the ones that fail on connection errors or gateway errors
+        self._session = requests.Session()
+        self._session.mount('https://', requests.adapters.HTTPAdapter(
+            pool_connections=4, pool_maxsize=32,
+            max_retries=_http_retry()))
+
+    def close(self):
+        self._session.close()
+
+    def concurrent_map(self, func, items):
+        """Calls func on each of the items concurrently, keeping their order.
+
+        The number of concurrent calls is capped by the
+        xtremio_max_parallel_requests option.
+        """
+        return _concurrent_map(func, items, self.configuration.safe_get(
+            'xtremio_max_parallel_requests'))
+
+    def invalidate_cache(self, object_type):
+        """Drops the cached responses of an object type."""
+        self._metadata_cache.invalidate(object_type)
+
+    def req_many(self, reqs):
+        """Sends independent requests concurrently.
+
+        :param reqs: list of dicts with the keyword arguments of each req call
+        :returns: list of the responses, in the order of the requests
+        """
+        return self.concurrent_map(lambda kwargs: self.req(**kwargs), reqs)
 
     def get_base_url(self, ver):
-        if ver == 'v1':
-            return 'https://%s/api/json/types' % self.configuration.san_ip
-        elif ver == 'v2':
-            return 'https://%s/api/json/v2/types' % self.configuration.san_ip
+        return self._base_urls.get(ver)
 
     def req(self, object_type='volumes', method='GET', data=None,
             name=None, idx=None, ver='v1'):
@@ -144,14 +384,19 @@ class XtremIOClient(object):
             if method in ('GET', 'DELETE'):
                 params.update(data)
                 self.update_url(params, self.cluster_id)
-            if method != 'GET':
+            if method == 'GET':
+                # everything the XMS needs is in the query string
+                body = None
+            else:
                 self.update_data(data, self.cluster_id)
-                # data may include chap password
-                LOG.debug('data: %s', strutils.mask_password(data))
+                body = _json_dumps(data)
+                if LOG.isEnabledFor(logging.DEBUG):
+                    # data may include chap password
+                    LOG.debug('data: %s', strutils.mask_password(data))
             LOG.debug('%(type)s %(url)s', {'type': method, 'url': url})
             try:
-                response = requests.request(
-                    method, url, params=params, data=json.dumps(data),
+                response = self._session.request(
+                    method, url, params=params, data=body,
                     verify=self.verify, auth=(self.configuration.san_login,
                                               self.configuration.san_password))
             except requests.exceptions.RequestException as exc:
@@ -161,12 +406,26 @@ class XtremIOClient(object):
             if (http_client.OK <= response.status_code <
                     http_client.MULTIPLE_CHOICES):
                 if method in ('GET', 'POST'):
-                    return response.json()
+                    return _json_loads(response)
                 else:
                     return ''
 
             self.handle_errors(response, key, object_type)
-        return _do_req(object_type, method, data, name, idx, ver)
+        if method != 'GET':
+            try:
+                return _do_req(object_type, method, data, name, idx, ver)
+            finally:
+                self._metadata_cache.invalidate(object_type)
+
+        ttl = METADATA_CACHE_TTL.get(object_type)
+        if not ttl:
+            return _do_req(object_type, method, data, name, idx, ver)
+        key = (object_type, name, idx, ver, json.dumps(data, sort_keys=True))
+        res = self._metadata_cache.get(key)
+        if res is None:
+            res = _do_req(object_type, method, data, name, idx, ver)
+            self._metadata_cache.put(key, res, ttl)
+        return res
 
     def handle_errors(self, response, key, object_type):
         if response.status_code == http_client.BAD_REQUEST:
@@ -178,6 +437,8 @@ class XtremIOClient(object):
                             {'key': key, 'typ': object_type,
                              'err_msg': err_msg, })
                 raise exception.NotFound()
+            elif err_msg in ERR_EXCEPTIONS:
+                raise ERR_EXCEPTIONS[err_msg]()
             elif err_msg == VOL_NOT_UNIQUE_ERR:
                 LOG.error("can't create 2 volumes with the same name, %s",
                           err_msg)
@@ -189,10 +450,6 @@ class XtremIOClient(object):
                 raise exception.VolumeNotFound(volume_id=key)
             elif ALREADY_MAPPED_ERR in err_msg:
                 raise exception.XtremIOAlreadyMappedError()
-            elif err_msg == SYSTEM_BUSY:
-                raise exception.XtremIOArrayBusy()
-            elif err_msg in (TOO_MANY_OBJECTS, TOO_MANY_SNAPSHOTS_PER_VOL):
-                raise exception.XtremIOSnapshotsLimitExceeded()
         msg = _('Bad response from XMS, %s') % response.text
         LOG.error(msg)
         raise exception.VolumeBackendAPIException(message=msg)
@@ -227,76 +484,74 @@ class XtremIOClient(object):
         pass
 
     def get_initiators_igs(self, port_addresses):
-        ig_indexes = set()
-        for port_address in port_addresses:
-            initiator = self.get_initiator(port_address)
-            ig_indexes.add(initiator['ig-id'][XTREMIO_OID_INDEX])
-
-        return list(ig_indexes)
+        initiators = self.concurrent_map(self.get_initiator, port_addresses)
+        return list(set(initiator['ig-id'][XTREMIO_OID_INDEX]
+                        for initiator in initiators))
 
     def get_fc_up_ports(self):
-        targets = [self.req('targets', name=target['name'])['content']
-                   for target in self.req('targets')['targets']]
+        targets = self.concurrent_map(
+            lambda target: self.req('targets', name=target['name'])['content'],
+            self.req('targets')['targets'])
         return [target for target in targets
                 if target['port-type'] == 'fc' and
                 target["port-state"] == 'up']
 
 
 class XtremIOClient3(XtremIOClient):
-    def __init__(self, configuration, cluster_id):
-        super(XtremIOClient3, self).__init__(configuration, cluster_id)
-        self._portals = []
+    def _get_lun_maps(self):
+        """Gets the details of all the lun-maps.
+
+        XMS versions which ignore `full` only return links to the lun-maps,
+        in which case their details are retrieved one by one.
+        """
+        lun_maps = self.req('lun-maps', data={'full': 1})['lun-maps']
+        return (lm for lm in six.moves.map(self._get_lun_map, lun_maps) if lm)
+
+    def _get_lun_map(self, lun_map):
+        if 'ig-name' in lun_map:
+            return lun_map
+        idx = lun_map['href'].rsplit('/', 1)[-1]
+        # NOTE(geguileo): There can be races so mapped elements retrieved
+        # in the listing may no longer exist.
+        try:
+            return self.req('lun-maps', idx=int(idx))['content']
+        except exception.NotFound:
+            return None
 
     def find_lunmap(self, ig_name, vol_name):
         try:
-            lun_mappings = self.req('lun-maps')['lun-maps']
+            lun_mappings = self._get_lun_maps()
         except exception.NotFound:
             raise (exception.VolumeDriverException
                    (_("can't find lun-map, ig:%(ig)s vol:%(vol)s") %
                     {'ig': ig_name, 'vol': vol_name}))
 
-        for lm_link in lun_mappings:
-            idx = lm_link['href'].split('/')[-1]
-            # NOTE(geguileo): There can be races so mapped elements retrieved
-            # in the listing may no longer exist.
-            try:
-                lm = self.req('lun-maps', idx=int(idx))['content']
-            except exception.NotFound:
-                continue
+        for lm in lun_mappings:
             if lm['ig-name'] == ig_name and lm['vol-name'] == vol_name:
                 return lm
 
         return None
 
     def num_of_mapped_volumes(self, initiator):
-        cnt = 0
-        for lm_link in self.req('lun-maps')['lun-maps']:
-            idx = lm_link['href'].split('/')[-1]
-            # NOTE(geguileo): There can be races so mapped elements retrieved
-            # in the listing may no longer exist.
-            try:
-                lm = self.req('lun-maps', idx=int(idx))['content']
-            except exception.NotFound:
-                continue
-            if lm['ig-name'] == initiator:
-                cnt += 1
-        return cnt
+        return sum(1 for lm in self._get_lun_maps()
+                   if lm['ig-name'] == initiator)
 
     def get_iscsi_portals(self):
-        if self._portals:
-            return self._portals
-
-        iscsi_portals = [t['name'] for t in self.req('iscsi-portals')
-                         ['iscsi-portals']]
-        for portal_name in iscsi_portals:
-            try:
-                self._portals.append(self.req('iscsi-portals',
-                                              name=portal_name)['content'])
-            except exception.NotFound:
-                raise (exception.VolumeBackendAPIException
-                       (data=_("iscsi portal, %s, not found") % portal_name))
-
-        return self._portals
+        # both the listing and the portal details come from the metadata
+        # cache while they are fresh
+        iscsi_portals = self.req('iscsi-portals',
+                                 data={'full': 1})['iscsi-portals']
+        return self.concurrent_map(self._get_iscsi_portal, iscsi_portals)
+
+    def _get_iscsi_portal(self, portal):
+        if 'ip-addr' in portal:
+            return portal
+        # the XMS returned only the link to the portal
+        try:
+            return self.req('iscsi-portals', name=portal['name'])['content']
+        except exception.NotFound:
+            raise (exception.VolumeBackendAPIException
+                   (data=_("iscsi portal, %s, not found") % portal['name']))
 
     def create_snapshot(self, src, dest, ro=False):
         data = {'snap-vol-name': dest, 'ancestor-vol-id': src}
@@ -327,15 +582,15 @@ class XtremIOClient4(XtremIOClient):
         try:
             return (self.req('lun-maps',
                              data={'full': 1,
-                                   'filter': ['vol-name:eq:%s' % vol_name,
-                                              'ig-name:eq:%s' % ig_name]})
+                                   'filter': [_eq_filter('vol-name', vol_name),
+                                              _eq_filter('ig-name', ig_name)]})
                     ['lun-maps'][0])
         except (KeyError, IndexError):
             raise exception.VolumeNotFound(volume_id=vol_name)
 
     def num_of_mapped_volumes(self, initiator):
         return len(self.req('lun-maps',
-                            data={'filter': 'ig-name:eq:%s' % initiator})
+                            data={'filter': _eq_filter('ig-name', initiator)})
                    ['lun-maps'])
 
     def update_url(self, data, cluster_id):
@@ -362,7 +617,7 @@ class XtremIOClient4(XtremIOClient):
                 'snapshot-type': 'readonly' if ro else 'regular'}
 
         res = self.req('snapshots', 'POST', data, ver='v2')
-        typ, idx = res['links'][0]['href'].split('/')[-2:]
+        typ, idx = res['links'][0]['href'].rsplit('/', 2)[-2:]
 
         # rename the snapshot
         data = {'name': dest}
@@ -380,7 +635,8 @@ class XtremIOClient4(XtremIOClient):
 
     def get_initiator(self, port_address):
         inits = self.req('initiators',
-                         data={'filter': 'port-address:eq:' + port_address,
+                         data={'filter': _eq_filter('port-address',
+                                                    port_address),
                                'full': 1})['initiators']
         if len(inits) == 1:
             return inits[0]
@@ -390,14 +646,14 @@ class XtremIOClient4(XtremIOClient):
     def get_fc_up_ports(self):
         return self.req('targets',
                         data={'full': 1,
-                              'filter': ['port-type:eq:fc',
-                                         'port-state:eq:up'],
+                              'filter': [_eq_filter('port-type', 'fc'),
+                                         _eq_filter('port-state', 'up')],
                               'prop': 'port-address'})["targets"]
 
 
 class XtremIOClient42(XtremIOClient4):
     def get_initiators_igs(self, port_addresses):
-        init_filter = ','.join('port-address:eq:{}'.format(port_address) for
+        init_filter = ','.join(_eq_filter('port-address', port_address) for
                                port_address in port_addresses)
         initiators = self.req('initiators',
                               data={'filter': init_filter,
@@ -432,16 +688,31 @@ class XtremIOVolumeDriver(san.SanDriver):
         self.clean_ig = (self.configuration.safe_get('xtremio_clean_unused_ig')
                          or False)
         self._stats = {}
-        self.client = XtremIOClient3(self.configuration, self.cluster_id)
+        self._stats_time = 0
+        # check_for_setup_error replaces it if the array needs another client
+        self.client = XtremIOClient4(self.configuration, self.cluster_id)
 
     def _obj_from_result(self, res):
-        typ, idx = res['links'][0]['href'].split('/')[-2:]
+        typ, idx = res['links'][0]['href'].rsplit('/', 2)[-2:]
         return self.client.req(typ, idx=int(idx))['content']
 
     def check_for_setup_error(self):
+        # The v1 API is supported by all the XMS versions, use it to find
+        # out which client fits the array.
+        probe = XtremIOClient(self.configuration, self.cluster_id)
         try:
-            name = self.client.req('clusters')['clusters'][0]['name']
-            cluster = self.client.req('clusters', name=name)['content']
+            client_cls, client_ver = self._get_client_class(probe)
+        finally:
+            probe.close()
+        if type(self.client) is not client_cls:
+            self.client.close()
+            self.client = client_cls(self.configuration, self.cluster_id)
+        LOG.info('Using XtremIO Client %s', client_ver)
+
+    def _get_client_class(self, probe):
+        try:
+            name = probe.req('clusters')['clusters'][0]['name']
+            cluster = probe.req('clusters', name=name)['content']
             version_text = cluster['sys-sw-version']
         except exception.NotFound:
             msg = _("XtremIO not initialized correctly, no clusters found")
@@ -457,27 +728,21 @@ class XtremIOVolumeDriver(san.SanDriver):
             raise exception.VolumeBackendAPIException(data=msg)
         else:
             LOG.info('XtremIO Cluster version %s', version_text)
-        client_ver = '3'
-        if ver[0] >= 4:
-            # get XMS version
-            xms = self.client.req('xms', idx=1)['content']
-            xms_version = tuple([int(i) for i in
-                                 xms['sw-version'].split('-')[0].split('.')])
-            LOG.info('XtremIO XMS version %s', version_text)
-            if xms_version >= (4, 2):
-                self.client = XtremIOClient42(self.configuration,
-                                              self.cluster_id)
-                client_ver = '4.2'
-            else:
-                self.client = XtremIOClient4(self.configuration,
-                                             self.cluster_id)
-                client_ver = '4'
-        LOG.info('Using XtremIO Client %s', client_ver)
+        if ver[0] < 4:
+            return XtremIOClient3, '3'
+        # get XMS version
+        xms = probe.req('xms', idx=1)['content']
+        xms_version = tuple([int(i) for i in
+                             xms['sw-version'].split('-')[0].split('.')])
+        LOG.info('XtremIO XMS version %s', version_text)
+        if xms_version >= (4, 2):
+            return XtremIOClient42, '4.2'
+        return XtremIOClient4, '4'
 
     def create_volume(self, volume):
         """Creates a volume."""
         data = {'vol-name': volume['id'],
-                'vol-size': str(volume['size']) + 'g'
+                'vol-size': _vol_size(volume['size'])
                 }
         self.client.req('volumes', 'POST', data)
 
@@ -529,14 +794,17 @@ class XtremIOVolumeDriver(san.SanDriver):
 
     def create_cloned_volume(self, volume, src_vref):
         """Creates a clone of the specified volume."""
-        vol = self.client.req('volumes', name=src_vref['id'])['content']
         ctxt = context.get_admin_context()
         cache = self.db.image_volume_cache_get_by_volume_id(ctxt,
                                                             src_vref['id'])
         limit = self.configuration.safe_get('xtremio_volumes_per_glance_cache')
-        if cache and limit and limit > 0 and limit <= vol['num-of-dest-snaps']:
-            raise exception.CinderException('Exceeded the configured limit of '
-                                            '%d snapshots per volume' % limit)
+        if cache and limit and limit > 0:
+            vol = self.client.req('volumes', name=src_vref['id'],
+                                  data={'prop': 'num-of-dest-snaps'})
+            if limit <= vol['content']['num-of-dest-snaps']:
+                raise exception.CinderException('Exceeded the configured '
+                                                'limit of %d snapshots per '
+                                                'volume' % limit)
         try:
             self.client.create_snapshot(src_vref['id'], volume['id'])
         except exception.XtremIOSnapshotsLimitExceeded as e:
@@ -596,7 +864,10 @@ class XtremIOVolumeDriver(san.SanDriver):
 
         return {'_name_id': name_id, 'provider_location': provider_location}
 
-    def _update_volume_stats(self):
+    def _update_volume_stats(self, force=False):
+        now = timeutils.now()
+        if not force and self._stats and now - self._stats_time < STATS_TTL:
+            return
         sys = self.client.get_cluster()
         physical_space = int(sys["ud-ssd-space"]) / units.Mi
         used_physical_space = int(sys["ud-ssd-space-in-use"]) / units.Mi
@@ -619,6 +890,7 @@ class XtremIOVolumeDriver(san.SanDriver):
                        'multiattach': False,
                        }
         self._stats.update(self.client.get_extra_capabilities())
+        self._stats_time = now
 
     def get_volume_stats(self, refresh=False):
         """Get volume stats.
@@ -632,28 +904,27 @@ class XtremIOVolumeDriver(san.SanDriver):
     def manage_existing(self, volume, existing_ref, is_snapshot=False):
         """Manages an existing LV."""
         lv_name = existing_ref['source-name']
-        # Attempt to locate the volume.
         try:
-            vol_obj = self.client.req('volumes', name=lv_name)['content']
-            if (
-                is_snapshot and
-                (not vol_obj['ancestor-vol-id'] or
-                 vol_obj['ancestor-vol-id'][XTREMIO_OID_NAME] !=
-                 volume.volume_id)):
-                kwargs = {'existing_ref': lv_name,
-                          'reason': 'Not a snapshot of vol %s' %
-                          volume.volume_id}
-                raise exception.ManageExistingInvalidReference(**kwargs)
+            if is_snapshot:
+                vol_obj = self.client.req('volumes', name=lv_name,
+                                          data={'prop': 'ancestor-vol-id'})
+                ancestor = vol_obj['content']['ancestor-vol-id']
+                if (not ancestor or
+                        ancestor[XTREMIO_OID_NAME] != volume.volume_id):
+                    kwargs = {'existing_ref': lv_name,
+                              'reason': 'Not a snapshot of vol %s' %
+                              volume.volume_id}
+                    raise exception.ManageExistingInvalidReference(**kwargs)
+            # Attempt to rename the LV to match the OpenStack internal name,
+            # the array tells us if it doesn't exist.
+            self.client.req('volumes', 'PUT', name=lv_name,
+                            data={'vol-name': volume['id']})
         except exception.NotFound:
             kwargs = {'existing_ref': lv_name,
                       'reason': 'Specified logical %s does not exist.' %
                       'snapshot' if is_snapshot else 'volume'}
             raise exception.ManageExistingInvalidReference(**kwargs)
 
-        # Attempt to rename the LV to match the OpenStack internal name.
-        self.client.req('volumes', 'PUT', data={'vol-name': volume['id']},
-                        idx=vol_obj['index'])
-
     def manage_existing_get_size(self, volume, existing_ref,
                                  is_snapshot=False):
         """Return size of an existing LV for manage_existing."""
@@ -665,7 +936,8 @@ class XtremIOVolumeDriver(san.SanDriver):
         lv_name = existing_ref['source-name']
         # Attempt to locate the volume.
         try:
-            vol_obj = self.client.req('volumes', name=lv_name)['content']
+            vol_obj = self.client.req('volumes', name=lv_name,
+                                      data={'prop': 'vol-size'})['content']
         except exception.NotFound:
             kwargs = {'existing_ref': lv_name,
                       'reason': 'Specified logical %s does not exist.' %
@@ -701,7 +973,7 @@ class XtremIOVolumeDriver(san.SanDriver):
 
     def extend_volume(self, volume, new_size):
         """Extend an existing volume's size."""
-        data = {'vol-size': six.text_type(new_size) + 'g'}
+        data = {'vol-size': _vol_size(new_size)}
         try:
             self.client.req('volumes', 'PUT', data, name=volume['id'])
         except exception.NotFound:
@@ -725,11 +997,16 @@ class XtremIOVolumeDriver(san.SanDriver):
             LOG.info('Force detach volume %(vol)s from luns %(luns)s.',
                      {'vol': vol['name'], 'luns': ig_indexes})
         else:
-            vol = self.client.req('volumes', name=volume.id,
-                                  data={'prop': 'index'})['content']
-            ig_indexes = self._get_ig_indexes_from_initiators(connector)
+            # the volume and the IGs are independent lookups, run them
+            # side by side
+            wait_vol = _spawn(self.client.req, 'volumes', name=volume.id,
+                              data={'prop': 'index'})
+            try:
+                ig_indexes = self._get_ig_indexes_from_initiators(connector)
+            finally:
+                vol = wait_vol()['content']
 
-        for ig_idx in ig_indexes:
+        def _delete_lun_map(ig_idx):
             lm_name = '%s_%s_%s' % (six.text_type(vol['index']),
                                     six.text_type(ig_idx),
                                     tg_index)
@@ -739,24 +1016,31 @@ class XtremIOVolumeDriver(san.SanDriver):
             except exception.NotFound:
                 LOG.warning("terminate_connection: lun map not found")
 
+        self.client.concurrent_map(_delete_lun_map, ig_indexes)
+
+        def _clean_ig(idx):
+            try:
+                ig = self.client.req('initiator-groups', 'GET',
+                                     {'prop': 'num-of-vols'},
+                                     idx=idx)['content']
+                if ig['num-of-vols'] == 0:
+                    self.client.req('initiator-groups', 'DELETE', idx=idx)
+            except (exception.NotFound,
+                    exception.VolumeBackendAPIException):
+                LOG.warning('Failed to clean IG %d without mappings', idx)
+
         if self.clean_ig:
-            for idx in ig_indexes:
-                try:
-                    ig = self.client.req('initiator-groups', 'GET',
-                                         {'prop': 'num-of-vols'},
-                                         idx=idx)['content']
-                    if ig['num-of-vols'] == 0:
-                        self.client.req('initiator-groups', 'DELETE', idx=idx)
-                except (exception.NotFound,
-                        exception.VolumeBackendAPIException):
-                    LOG.warning('Failed to clean IG %d without mappings', idx)
+            self.client.concurrent_map(_clean_ig, ig_indexes)
 
     def _get_password(self):
-        return ''.join(RANDOM.choice
-                       (string.ascii_uppercase + string.digits)
-                       for _ in range(12))
+        # 12 upper case letters and digits taken from the system's CSPRNG
+        return base64.b32encode(os.urandom(10)).decode('ascii')[:12]
 
     def create_lun_map(self, volume, ig, lun_num=None):
+        return self._create_lun_map(volume, ig, lun_num)[0]
+
+    def _create_lun_map(self, volume, ig, lun_num=None):
+        """Returns the lun-map and whether it was created by this call."""
         try:
             data = {'ig-id': ig, 'vol-id': volume['id']}
             if lun_num:
@@ -768,8 +1052,8 @@ class XtremIOVolumeDriver(san.SanDriver):
         except exception.XtremIOAlreadyMappedError:
             LOG.info('Volume already mapped, retrieving %(ig)s, %(vol)s',
                      {'ig': ig, 'vol': volume['id']})
-            lunmap = self.client.find_lunmap(ig, volume['id'])
-        return lunmap
+            return self.client.find_lunmap(ig, volume['id']), False
+        return lunmap, True
 
     def _get_ig_name(self, connector):
         raise NotImplementedError()
@@ -799,15 +1083,10 @@ class XtremIOVolumeDriver(san.SanDriver):
         self.client.req('consistency-groups', 'DELETE', name=group['id'],
                         ver='v2')
 
-        volumes_model_update = []
-
-        for volume in volumes:
-            self.delete_volume(volume)
-
-            update_item = {'id': volume['id'],
-                           'status': 'deleted'}
-
-            volumes_model_update.append(update_item)
+        # the volumes are independent of each other, delete them concurrently
+        self.client.concurrent_map(self.delete_volume, volumes)
+        volumes_model_update = [{'id': volume['id'], 'status': 'deleted'}
+                                for volume in volumes]
 
         model_update = {'status': group['status']}
 
@@ -816,13 +1095,17 @@ class XtremIOVolumeDriver(san.SanDriver):
     def _get_snapset_ancestors(self, snapset_name):
         snapset = self.client.req('snapshot-sets',
                                   name=snapset_name)['content']
-        volume_ids = [s[XTREMIO_OID_INDEX] for s in snapset['vol-list']]
-        return {v['ancestor-vol-id'][XTREMIO_OID_NAME]: v['name'] for v
-                in self.client.req('volumes',
-                                   data={'full': 1,
-                                         'props':
-                                         'ancestor-vol-id'})['volumes']
-                if v['index'] in volume_ids}
+        snap_names = {s[XTREMIO_OID_INDEX]: s[XTREMIO_OID_NAME]
+                      for s in snapset['vol-list']}
+        # One listing for the whole set, projected to the two fields needed
+        # so it stays small even on large arrays. The names of the
+        # snapshots are already in the set.
+        volumes = self.client.req('volumes',
+                                  data={'full': 1,
+                                        'prop': ['ancestor-vol-id', 'index']}
+                                  )['volumes']
+        return {v['ancestor-vol-id'][XTREMIO_OID_NAME]: snap_names[v['index']]
+                for v in volumes if v['index'] in snap_names}
 
     def create_consistencygroup_from_src(self, context, group, volumes,
                                          cgsnapshot=None, snapshots=None,
@@ -848,22 +1131,27 @@ class XtremIOVolumeDriver(san.SanDriver):
         if cgsnapshot:
             snap_name = self._get_cgsnap_name(cgsnapshot)
             snap_by_anc = self._get_snapset_ancestors(snap_name)
-            for volume, snapshot in zip(volumes, snapshots):
-                real_snap = snap_by_anc[snapshot['volume_id']]
+
+            def _create_from_snapshot(volume_snapshot):
+                volume, snapshot = volume_snapshot
                 self.create_volume_from_snapshot(
                     volume,
-                    {'id': real_snap,
+                    {'id': snap_by_anc[snapshot['volume_id']],
                      'volume_size': snapshot['volume_size']})
 
+            self.client.concurrent_map(_create_from_snapshot,
+                                       zip(volumes, snapshots))
+
         elif source_cg:
             data = {'consistency-group-id': source_cg['id'],
                     'snapshot-set-name': group['id']}
             self.client.req('snapshots', 'POST', data, ver='v2')
             snap_by_anc = self._get_snapset_ancestors(group['id'])
-            for volume, src_vol in zip(volumes, source_vols):
-                snap_vol_name = snap_by_anc[src_vol['id']]
-                self.client.req('volumes', 'PUT', {'name': volume['id']},
-                                name=snap_vol_name)
+            self.client.req_many(
+                [{'object_type': 'volumes', 'method': 'PUT',
+                  'data': {'name': volume['id']},
+                  'name': snap_by_anc[src_vol['id']]}
+                 for volume, src_vol in zip(volumes, source_vols)])
 
         create_data = {'consistency-group-name': group['id'],
                        'vol-list': [v['id'] for v in volumes]}
@@ -884,14 +1172,15 @@ class XtremIOVolumeDriver(san.SanDriver):
         """
         add_volumes = add_volumes if add_volumes else []
         remove_volumes = remove_volumes if remove_volumes else []
-        for vol in add_volumes:
-            add_data = {'vol-id': vol['id'], 'cg-id': group['id']}
-            self.client.req('consistency-group-volumes', 'POST', add_data,
-                            ver='v2')
-        for vol in remove_volumes:
-            remove_data = {'vol-id': vol['id'], 'cg-id': group['id']}
-            self.client.req('consistency-group-volumes', 'DELETE', remove_data,
-                            name=group['id'], ver='v2')
+        self.client.req_many(
+            [{'object_type': 'consistency-group-volumes', 'method': 'POST',
+              'data': {'vol-id': vol['id'], 'cg-id': group['id']},
+              'ver': 'v2'}
+             for vol in add_volumes] +
+            [{'object_type': 'consistency-group-volumes', 'method': 'DELETE',
+              'data': {'vol-id': vol['id'], 'cg-id': group['id']},
+              'name': group['id'], 'ver': 'v2'}
+             for vol in remove_volumes])
         return None, None, None
 
     def _get_cgsnap_name(self, cgsnapshot):
@@ -900,9 +1189,7 @@ class XtremIOVolumeDriver(san.SanDriver):
         if group_id is None:
             group_id = cgsnapshot.get('consistencygroup_id')
 
-        return '%(cg)s%(snap)s' % {'cg': group_id
-                                   .replace('-', ''),
-                                   'snap': cgsnapshot['id'].replace('-', '')}
+        return (group_id + cgsnapshot['id']).replace('-', '')
 
     def create_cgsnapshot(self, context, cgsnapshot, snapshots):
         """Creates a cgsnapshot."""
@@ -1021,12 +1308,15 @@ class XtremIOVolumeDriver(san.SanDriver):
     def _create_ig(self, name):
         # create an initiator group to hold the initiator
         data = {'ig-name': name}
-        self.client.req('initiator-groups', 'POST', data)
+        res = self.client.req('initiator-groups', 'POST', data)
+        # the reply links to the new IG, which is all the callers need to
+        # know of it, so don't fetch it back
         try:
-            return self.client.req('initiator-groups', name=name)['content']
-        except exception.NotFound:
+            idx = int(res['links'][0]['href'].rsplit('/', 1)[-1])
+        except (KeyError, IndexError, TypeError, ValueError):
             raise (exception.VolumeBackendAPIException
                    (data=_("Failed to create IG, %s") % name))
+        return {'name': name, 'index': idx, 'ig-id': ['', name, idx]}
 
 
 @interface.volumedriver
@@ -1050,6 +1340,25 @@ class XtremIOISCSIDriver(XtremIOVolumeDriver, driver.ISCSIDriver):
     def __init__(self, *args, **kwargs):
         super(XtremIOISCSIDriver, self).__init__(*args, **kwargs)
         self.protocol = 'iSCSI'
+        self._chap_modes = None
+        self._chap_modes_time = 0
+
+    def _get_chap_modes(self):
+        """Returns whether login and discovery CHAP are enabled."""
+        now = timeutils.now()
+        if (self._chap_modes is None or
+                now - self._chap_modes_time >= CHAP_MODES_TTL):
+            try:
+                sys = self.client.get_cluster()
+            except exception.NotFound:
+                msg = _("XtremIO not initialized correctly, no clusters "
+                        "found")
+                raise exception.VolumeBackendAPIException(data=msg)
+            self._chap_modes = (
+                sys.get('chap-authentication-mode', 'disabled') != 'disabled',
+                sys.get('chap-discovery-mode', 'disabled') != 'disabled')
+            self._chap_modes_time = now
+        return self._chap_modes
 
     def _add_auth(self, data, login_chap, discovery_chap):
         login_passwd, discovery_passwd = None, None
@@ -1074,15 +1383,7 @@ class XtremIOISCSIDriver(XtremIOVolumeDriver, driver.ISCSIDriver):
         return l, d
 
     def initialize_connection(self, volume, connector):
-        try:
-            sys = self.client.get_cluster()
-        except exception.NotFound:
-            msg = _("XtremIO not initialized correctly, no clusters found")
-            raise exception.VolumeBackendAPIException(data=msg)
-        login_chap = (sys.get('chap-authentication-mode', 'disabled') !=
-                      'disabled')
-        discovery_chap = (sys.get('chap-discovery-mode', 'disabled') !=
-                          'disabled')
+        login_chap, discovery_chap = self._get_chap_modes()
         initiator_name = self._get_initiator_names(connector)[0]
         initiator = self.client.get_initiator(initiator_name)
         if initiator:
@@ -1098,6 +1399,7 @@ class XtremIOISCSIDriver(XtremIOVolumeDriver, driver.ISCSIDriver):
                                                         login_chap,
                                                         discovery_chap)
         # if CHAP was enabled after the initiator was created
+        wait_auth = None
         if login_chap and not login_passwd:
             LOG.info('Initiator has no password while using chap, adding it.')
             data = {}
@@ -1106,10 +1408,28 @@ class XtremIOISCSIDriver(XtremIOVolumeDriver, driver.ISCSIDriver):
                                         not discovery_passwd)
             discovery_passwd = (discovery_passwd if discovery_passwd
                                 else d_passwd)
-            self.client.req('initiators', 'PUT', data, idx=initiator['index'])
+            # the lun mapping doesn't depend on the initiator's passwords
+            wait_auth = _spawn(self.client.req, 'initiators', 'PUT', data,
+                               idx=initiator['index'])
 
         # lun mappping
-        lunmap = self.create_lun_map(volume, ig['ig-id'][XTREMIO_OID_NAME])
+        lunmap = created = None
+        try:
+            lunmap, created = self._create_lun_map(
+                volume, ig['ig-id'][XTREMIO_OID_NAME])
+        finally:
+            if wait_auth is not None:
+                try:
+                    wait_auth()
+                except Exception:
+                    with excutils.save_and_reraise_exception():
+                        # the host can't log in, don't leave the new map
+                        if created:
+                            LOG.info('Removing lun-map %s, failed to set '
+                                     'the initiator password.',
+                                     lunmap['name'])
+                            self.client.req('lun-maps', 'DELETE',
+                                            name=lunmap['name'])
 
         properties = self._get_iscsi_properties(lunmap)
 
@@ -1147,22 +1467,23 @@ class XtremIOISCSIDriver(XtremIOVolumeDriver, driver.ISCSIDriver):
         """
         portals = self.client.get_iscsi_portals()
         if not portals:
+            # don't keep serving the empty list once portals are configured
+            self.client.invalidate_cache('iscsi-portals')
             msg = _("XtremIO not configured correctly, no iscsi portals found")
             LOG.error(msg)
             raise exception.VolumeDriverException(message=msg)
-        portal = RANDOM.choice(portals)
-        portal_addr = ('%(ip)s:%(port)d' %
-                       {'ip': portal['ip-addr'].split('/')[0],
-                        'port': portal['ip-port']})
-
         tg_portals = ['%(ip)s:%(port)d' % {'ip': p['ip-addr'].split('/')[0],
                                            'port': p['ip-port']}
                       for p in portals]
+        tg_iqns = [p['port-address'] for p in portals]
+        # the main portal is picked among the formatted ones, a single
+        # portal needs no draw at all
+        main = RANDOM.randrange(len(portals)) if len(portals) > 1 else 0
         properties = {'target_discovered': False,
-                      'target_iqn': portal['port-address'],
+                      'target_iqn': tg_iqns[main],
                       'target_lun': lunmap['lun'],
-                      'target_portal': portal_addr,
-                      'target_iqns': [p['port-address'] for p in portals],
+                      'target_portal': tg_portals[main],
+                      'target_iqns': tg_iqns,
                       'target_portals': tg_portals,
                       'target_luns': [lunmap['lun']] * len(portals)}
         return properties
@@ -1182,69 +1503,104 @@ class XtremIOFCDriver(XtremIOVolumeDriver,
         super(XtremIOFCDriver, self).__init__(*args, **kwargs)
         self.protocol = 'FC'
         self._targets = None
+        self._targets_time = 0
+        self._targets_refreshing = False
+
+    def _refresh_targets(self):
+        try:
+            targets = self.client.get_fc_up_ports()
+        except exception.NotFound:
+            raise (exception.VolumeBackendAPIException
+                   (data=_("Failed to get targets")))
+        self._targets = [target['port-address'].replace(':', '')
+                         for target in targets]
+        self._targets_time = timeutils.now()
+
+    def _refresh_targets_in_background(self):
+        try:
+            self._refresh_targets()
+        except Exception:
+            LOG.warning('Failed to refresh the FC targets, keeping the '
+                        'known ones.', exc_info=True)
+        finally:
+            self._targets_refreshing = False
 
     def get_targets(self):
         if not self._targets:
-            try:
-                targets = self.client.get_fc_up_ports()
-                self._targets = [target['port-address'].replace(':', '')
-                                 for target in targets]
-            except exception.NotFound:
-                raise (exception.VolumeBackendAPIException
-                       (data=_("Failed to get targets")))
+            self._refresh_targets()
+        elif (timeutils.now() - self._targets_time >= FC_TARGETS_TTL and
+              not self._targets_refreshing):
+            self._targets_refreshing = True
+            eventlet.spawn_n(self._refresh_targets_in_background)
         return self._targets
 
-    def _get_free_lun(self, igs):
-        luns = []
-        for ig in igs:
-            luns.extend(lm['lun'] for lm in
-                        self.client.req('lun-maps',
-                                        data={'full': 1, 'prop': 'lun',
-                                              'filter': 'ig-name:eq:%s' % ig})
-                        ['lun-maps'])
-        uniq_luns = set(luns + [0])
-        seq = range(len(uniq_luns) + 1)
-        return min(set(seq) - uniq_luns)
+    def _get_lun_num(self, igs, vol_name):
+        """Returns the lun to map the volume with in all the IGs.
+
+        The host must see the volume under the same lun through all of its
+        IGs, so if one of them already maps the volume (e.g. on a retried
+        attach) its lun is reused. Otherwise the lowest lun free in all the
+        IGs is returned.
+        """
+        ig_lun_maps = self.client.concurrent_map(
+            lambda ig: self.client.req(
+                'lun-maps', data={'full': 1, 'prop': ['lun', 'vol-name'],
+                                  'filter': _eq_filter('ig-name', ig)}
+            )['lun-maps'],
+            igs)
+        luns = set()
+        for lun_maps in ig_lun_maps:
+            for lm in lun_maps:
+                if lm.get('vol-name') == vol_name:
+                    return lm['lun']
+                luns.add(lm['lun'])
+        # lun 0 is never handed out
+        lun = 1
+        while lun in luns:
+            lun += 1
+        return lun
 
     @fczm_utils.add_fc_zone
     def initialize_connection(self, volume, connector):
         wwpns = self._get_initiator_names(connector)
         ig_name = self._get_ig_name(connector)
-        i_t_map = {}
         found = []
         new = []
-        for wwpn in wwpns:
-            init = self.client.get_initiator(wwpn)
+        inits = self.client.concurrent_map(self.client.get_initiator, wwpns)
+        for wwpn, init in zip(wwpns, inits):
             if init:
                 found.append(init)
             else:
                 new.append(wwpn)
-            i_t_map[wwpn.replace(':', '')] = self.get_targets()
+        tgts = self.get_targets()
+        i_t_map = self._get_initiator_target_map(connector, tgts)
         # get or create initiator group
         if new:
             ig = self._get_ig(ig_name)
             if not ig:
                 ig = self._create_ig(ig_name)
-            for wwpn in new:
-                data = {'initiator-name': wwpn, 'ig-id': ig_name,
-                        'port-address': wwpn}
-                self.client.req('initiators', 'POST', data)
+            self.client.req_many(
+                [{'object_type': 'initiators', 'method': 'POST',
+                  'data': {'initiator-name': wwpn, 'ig-id': ig_name,
+                           'port-address': wwpn}}
+                 for wwpn in new])
         igs = list(set([i['ig-id'][XTREMIO_OID_NAME] for i in found]))
         if new and ig['ig-id'][XTREMIO_OID_NAME] not in igs:
             igs.append(ig['ig-id'][XTREMIO_OID_NAME])
 
         if len(igs) > 1:
-            lun_num = self._get_free_lun(igs)
+            lun_num = self._get_lun_num(igs, volume['id'])
         else:
             lun_num = None
-        for ig in igs:
-            lunmap = self.create_lun_map(volume, ig, lun_num)
-            lun_num = lunmap['lun']
+        # the lun is fixed upfront, so the maps don't depend on each other
+        lunmaps = self.client.concurrent_map(
+            lambda ig: self.create_lun_map(volume, ig, lun_num), igs)
+        lun_num = lunmaps[-1]['lun']
         return {'driver_volume_type': 'fibre_channel',
                 'data': {
                     'target_discovered': False,
                     'target_lun': lun_num,
-                    'target_wwn': self.get_targets(),
+                    'target_wwn': tgts,
                     'initiator_target_map': i_t_map}}
 
     @fczm_utils.remove_fc_zone
@@ -1258,19 +1614,22 @@ class XtremIOFCDriver(XtremIOVolumeDriver,
         if has_volumes:
             data = {}
         else:
-            i_t_map = {}
-            for initiator in self._get_initiator_names(connector):
-                i_t_map[initiator.replace(':', '')] = self.get_targets()
-            data = {'target_wwn': self.get_targets(),
-                    'initiator_target_map': i_t_map}
+            tgts = self.get_targets()
+            data = {'target_wwn': tgts,
+                    'initiator_target_map':
+                        self._get_initiator_target_map(connector, tgts)}
 
         return {'driver_volume_type': 'fibre_channel',
                 'data': data}
 
+    def _get_initiator_target_map(self, connector, targets):
+        # the connector usually has the WWPNs without colons already, all of
+        # them share the same targets list
+        return dict.fromkeys((wwpn.replace(':', '')
+                              for wwpn in connector['wwpns']), targets)
+
     def _get_initiator_names(self, connector):
-        return [wwpn if ':' in wwpn else
-                ':'.join(wwpn[i:i + 2] for i in range(0, len(wwpn), 2))
-                for wwpn in connector['wwpns']]
+        return [_colon_wwpn(wwpn) for wwpn in connector['wwpns']]
 
     def _get_ig_name(self, connector):
         return connector['host']